@@ -1,10 +1,30 @@
 import streamlit as st
 import pandas as pd
-import json
 import utils.common as com
 from utils.resume_extractor import resume_extractor
-from utils.pinecone_database import PineconeDatabase
-from match_alogorithm.calculate_match_score import calculate_match_score
+from utils.pinecone_database import PineconeDatabase, TOP_K, EMBEDDING_DIMENSION
+from utils.local_vector_database import LocalVectorDatabase
+from utils.clients import embedding_generator
+from match_alogorithm.calculate_match_score import calculate_match_score, SCORER_VERSIONS
+from match_alogorithm.candidate_retrieval import retrieve_candidates
+from match_alogorithm.utils.coarse_scores import CoarseVectors
+from match_alogorithm.utils.score_cache import SQLiteScoreStore
+from utils.job_store import JobStore, get_job_store, on_job_store_reload
+
+PARTIAL_RESULTS_SHOWN = 10  # best matches shown while the rest of the jobs are scored
+
+def partial_results_frame(found):
+    """The best matches found so far, as a table for the page being scored."""
+    best = sorted(found, key=lambda record: -record[1]['overall_score'])[:PARTIAL_RESULTS_SHOWN]
+    rows = []
+    for job in get_job_store().with_details(best):
+        details = job.get('details', {})
+        rows.append({
+            'Job Title': ', '.join(details.get('job_title_base', [])),
+            'Company': ', '.join(details.get('company_name', [])),
+            'Overall Score': int(job['match_scores']['overall_score'] * 100),
+        })
+    return pd.DataFrame(rows)
 
 @st.cache_data
 def read_city_state_data():
@@ -22,8 +42,28 @@ def read_city_state_data():
 def retrievePineconeIndex():
     pc = PineconeDatabase(st.secrets.pinecone.api_key, st.secrets.pinecone.index_name, st.secrets.pinecone.aws_region, st.secrets.pinecone.sagemaker_endpoint)
     pc.connect_to_pinecone()
+    # New postings mean a new corpus: don't serve searches cached before it
+    on_job_store_reload(pc.clear_search_cache)
     return pc
 
+@st.cache_resource
+def retrieveLocalVectorDatabase():
+    # Offline search path: FAISS index over the job vectors, queries embedded like Pinecone's
+    # by the SageMaker endpoint alone, so it works without a Pinecone connection
+    embedder = embedding_generator(st.secrets.pinecone.sagemaker_endpoint, st.secrets.pinecone.aws_region, EMBEDDING_DIMENSION)
+    return LocalVectorDatabase.load(embedder, st.secrets.pinecone.local_index_path)
+
+@st.cache_resource
+def retrieveScoreStore():
+    # Scorer results shared by every session and kept across restarts
+    return SQLiteScoreStore(scorer_versions=SCORER_VERSIONS)
+
+@st.cache_resource
+def retrieveCoarseVectors():
+    # Job-side vectors of the coarse pass, built with the job store (see build_coarse_vectors)
+    path = st.secrets.main.get('coarse_vectors_path')
+    return CoarseVectors.load(path) if path else None
+
 @st.cache_resource
 def retrieveOpenAIClient():
     print("calling retrieveOpenAIClient")
@@ -36,7 +76,7 @@ def main():
     com.includeCss(st, 'mirra.css')
     com.logger('Start MIRRA Matcher')
     cities_states = read_city_state_data()
-    pc = retrievePineconeIndex()
+    pc = retrievePineconeIndex() if st.secrets.pinecone.in_use else None
     client = retrieveOpenAIClient()
     if 'resume_filename' not in st.session_state:
         st.session_state['resume_filename'] = ''
@@ -132,29 +172,74 @@ def main():
                 with st.spinner("Looking for the best matches... Please wait!"):
 
                     com.logger(filter_dict)
-                    if st.secrets.pinecone.in_use:
-                        response = pc.search(keywords, filter_dict)
-                    else:
-                        response = ""
-                    # response = json.loads(vdb_result)
-                    if st.secrets.aws.bucket_name:
-                        job_list = com.find_record_by_ids_from_s3(response, st.secrets.aws.bucket_name, st.secrets.aws.file_key)
+                    resume = st.session_state['resume_json']
+                    if st.secrets.pinecone.in_use and keywords.strip():
+                        # Matches arrive page by page; jobs are looked up and scored as they come.
+                        # Splitting the search by a field (e.g. exp_level) is opt-in via the secrets.
+                        pages = pc.search_stream(keywords, filter_dict, budget=st.secrets.pinecone.get('search_budget', TOP_K), partition_field=st.secrets.pinecone.get('partition_field'))
+                        if st.secrets.aws.bucket_name:
+                            job_list = com.iter_record_by_ids_from_s3(pages, st.secrets.aws.bucket_name, st.secrets.aws.file_key)
+                        else:
+                            job_list = com.iter_record_by_ids(pages, st.secrets.aws.path)
                     else:
-                        com.logger("### Loading posting files...")    
-                        job_list = com.find_record_by_ids(response, st.secrets.aws.path)
+                        if st.secrets.pinecone.in_use or st.secrets.pinecone.get('local_index_path'):
+                            vector_db = pc if st.secrets.pinecone.in_use else retrieveLocalVectorDatabase()
+                            if keywords.strip():
+                                response = vector_db.search(keywords, filter_dict)
+                            else:
+                                # No keyword: score only the jobs closest to the resume itself
+                                response = retrieve_candidates(vector_db, resume, filter_dict)
+                            local_filters = None
+                        else:
+                            response = ""
+                            # No Pinecone: apply the filters to the postings locally
+                            local_filters = filter_dict
+                        # response = json.loads(vdb_result)
+                        if st.secrets.aws.bucket_name:
+                            job_list = com.find_record_by_ids_from_s3(response, st.secrets.aws.bucket_name, st.secrets.aws.file_key, filters=local_filters)
+                        else:
+                            com.logger("### Loading posting files...")    
+                            job_list = com.find_record_by_ids(response, st.secrets.aws.path, filters=local_filters)
                     # print(json.dumps(job_list))
-                    resume = st.session_state['resume_json']
                     com.logger(type(job_list))
                     com.logger(type(resume))
+                    # Job details stay in the shared job store (the postings are loaded into it
+                    # above); the session only keeps (job_id, match_scores) records and match.py
+                    # looks up the rows it shows. Demo jobs go to a store of this session only,
+                    # so they never show up in other sessions' results.
                     if st.secrets.main.demo:
-                        matches = com.read_json_result('match_result.json')
+                        demo_matches = com.read_json_result('match_result.json')
+                        demo_store = JobStore()
+                        demo_store.add(demo_matches)
+                        st.session_state['match_store'] = demo_store
+                        matches = [(job['job_id'], job['match_scores']) for job in demo_matches]
                     else:
-                        matches = calculate_match_score(job_desc_json_lst=job_list, candidate_resume_JSON=resume, parallel_processing=True)
+                        st.session_state.pop('match_store', None)
+                        progress_bar = st.progress(0.0, text="Scoring jobs...")
+                        # The best matches so far, redrawn with each progress event
+                        partial_results = st.empty()
+                        found = []
+
+                        def show_progress(progress):
+                            done = progress['scored'] + progress['rejected']
+                            progress_bar.progress(
+                                done / progress['total'] if progress['total'] else 1.0,
+                                text=f"{progress['scored']} matches found, {progress['remaining']} jobs left to score...",
+                            )
+                            if found:
+                                partial_results.dataframe(partial_results_frame(found), hide_index=True)
+
+                        def add_match(job_id, match_scores):
+                            found.append((job_id, match_scores))
+
+                        matches = calculate_match_score(job_desc_json_lst=job_list, candidate_resume_JSON=resume, parallel_processing=True, on_progress=show_progress, on_match=add_match, score_cache=retrieveScoreStore(), compact=True, coarse_top_fraction=st.secrets.main.get('coarse_top_fraction'), coarse_cutoff=st.secrets.main.get('coarse_cutoff'), coarse_vectors=retrieveCoarseVectors())
+                        progress_bar.empty()
+                        partial_results.empty()
                     com.logger(type(matches))
                     com.logger(len(matches))
                     if matches:
-                        matches = json.dumps(matches)
                         st.session_state['matches'] = matches
+                        st.session_state['match_page'] = 1
                         st.switch_page("pages/match.py")
             else:
                 print("Resume is not ready")
@@ -1,5 +1,5 @@
 let matching_data = null;
-function handleData(data) {{
+function handleData(data, total) {{
     data.sort(function(a, b) {{
         // Sort by value (descending)
         const valueA = a["match_scores"]["overall_score"];
@@ -23,7 +23,8 @@ function handleData(data) {{
     matching_data = data;
     console.log("Received JSON data:", matching_data);
     const parentDocument = window.parent.document;
-    parentDocument.getElementById('num_of_result').innerHTML = matching_data.length;
+    // total is the number of matches across all pages, when the data is one page of them
+    parentDocument.getElementById('num_of_result').innerHTML = total ?? matching_data.length;
     loadJoblist();
 }}
 
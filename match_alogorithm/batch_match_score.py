@@ -0,0 +1,105 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Imports
+from match_alogorithm.calculate_match_score import iter_pipeline
+from match_alogorithm.utils.embedding_prefetch import collect_terms, collect_resume_terms
+from match_alogorithm.utils.similarity_matrix import (
+    TermSimilarityMatrix,
+    embed_terms,
+    use_similarity_matrix,
+)
+from match_alogorithm.utils.score_table import ScoreTable
+
+RESUME_BLOCK = 32  # resumes whose terms are stacked into one similarity matrix
+BATCH_WORKERS = 4
+
+
+###############################################################################
+# Helper: Compile the shared job side once
+###############################################################################
+def compile_jobs(job_list):
+    """
+    Collects every term the scorers will embed from the job list and embeds them
+    once. Returns (col_index, col_vectors) for TermSimilarityMatrix.from_vectors.
+    """
+    return embed_terms(collect_terms(job_list))
+
+###############################################################################
+# Helper: Score one resume against the job list with a precomputed matrix
+###############################################################################
+def score_resume(job_list, resume, matrix):
+    """
+    Runs Stage 1 -> Stage 2 for one resume with `matrix` active, so every
+    similarity lookup is a read from the matrix, then Stage 3 for all surviving
+    jobs at once. Returns a ScoreTable of the jobs that have an overall score.
+    """
+    records = []
+    with use_similarity_matrix(matrix):
+        for job, stage2_scores in iter_pipeline(
+            job_list, resume, parallel_processing=False, overall_scores=False
+        ):
+            if stage2_scores is not None:
+                records.append((job.get("job_id"), stage2_scores))
+    table = ScoreTable.from_records(records).with_overall_scores()
+    return table.take(np.flatnonzero(~np.isnan(table.columns["overall_score"])))
+
+###############################################################################
+# Main Function: Score many resumes against one job list
+###############################################################################
+def calculate_match_scores_batch(job_list, resumes, parallel_processing=True):
+    """
+    Scores every resume in `resumes` against the same `job_list`.
+
+    The job side is compiled and embedded once. Resumes are processed in blocks
+    of RESUME_BLOCK: the terms of a block are embedded together and compared to
+    all job terms with a single matrix product, then each resume is scored from
+    that matrix. Job dicts are not modified.
+
+    Returns:
+      {
+        "job_ids": [job_id, ...],
+        "overall_scores": np.ndarray of shape (len(resumes), len(job_list)),
+                          NaN where the job was filtered out,
+        "match_scores": [{job_id: match_scores, ...} for each resume],
+      }
+    """
+    print(f"[calculate_match_scores_batch] {len(resumes)} resumes x {len(job_list)} jobs")
+    job_ids = [job.get("job_id") for job in job_list]
+    positions = {job_id: i for i, job_id in reversed(list(enumerate(job_ids)))}
+
+    col_index, col_vectors = compile_jobs(job_list)
+    print(f"[calculate_match_scores_batch] Compiled {len(col_index)} job terms")
+
+    tables = []
+    executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS) if parallel_processing else None
+    try:
+        for start in range(0, len(resumes), RESUME_BLOCK):
+            block = resumes[start:start + RESUME_BLOCK]
+            row_terms = set()
+            for resume in block:
+                row_terms |= collect_resume_terms(resume)
+            row_index, row_vectors = embed_terms(row_terms)
+            matrix = TermSimilarityMatrix.from_vectors(row_index, row_vectors, col_index, col_vectors)
+
+            if executor is not None:
+                tables.extend(
+                    executor.map(lambda resume: score_resume(job_list, resume, matrix), block)
+                )
+            else:
+                tables.extend(score_resume(job_list, resume, matrix) for resume in block)
+            print(f"[calculate_match_scores_batch] Scored resumes {start + 1}-{start + len(block)}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    overall_scores = np.full((len(resumes), len(job_list)), np.nan)
+    for r, table in enumerate(tables):
+        columns = [positions[job_id] for job_id in table.job_ids]
+        overall_scores[r, columns] = table.columns["overall_score"]
+
+    return {
+        "job_ids": job_ids,
+        "overall_scores": overall_scores,
+        "match_scores": [table.to_dict() for table in tables],
+    }
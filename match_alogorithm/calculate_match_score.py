@@ -1,6 +1,7 @@
-from concurrent.futures import ThreadPoolExecutor
-from functools import reduce
-from pinecone import Pinecone
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 import numpy as np
 
 # Imports
@@ -14,43 +15,223 @@ from match_alogorithm.utils.preferred_credentials_score import calculate_preferr
 from match_alogorithm.utils.mandatory_background_score import calculate_mandatory_background_scores
 from match_alogorithm.utils.preferred_background_score import calculate_preferred_background_scores
 from match_alogorithm.utils.merge_scores import merge_scores_by_job_id
+from match_alogorithm.utils.coarse_scores import coarse_scores, select_coarse
 from match_alogorithm.utils.overall_scores import make_overall_scores
+from match_alogorithm.utils.score_cache import MISSING, scorer_version
+from match_alogorithm.utils.score_table import ScoreTable, has_any_score
 
 
 ###############################################################################
-# Helper: Split a list into n roughly equal chunks
+# Scorer registry: the functions run for each stage, in merge order
 ###############################################################################
-def chunk_list(lst, n):
-    """Splits lst into n roughly even chunks."""
-    k, m = divmod(len(lst), n)
-    return [lst[i * k + min(i, m):(i + 1) * k + min(i + 1, m)] for i in range(n)]
+STAGE1_SCORERS = {
+    "mandatory_background": calculate_mandatory_background_scores,
+    "preferred_background": calculate_preferred_background_scores,
+    "mandatory_education": calculate_mandatory_education_scores,
+    "preferred_education": calculate_preferred_education_scores,
+    "mandatory_credentials": calculate_mandatory_credentials_scores,
+    "preferred_credentials": calculate_preferred_credentials_scores,
+}
+
+STAGE2_SCORERS = {
+    "responsibilities": calculate_responsibilities_scores,
+    "mandatory_skills": calculate_mandatory_skill_scores,
+    "preferred_skills": calculate_preferred_skill_scores,
+}
+
+# Invalidate cached results of a scorer when its module changes (see score_cache.py).
+SCORER_VERSIONS = {
+    name: scorer_version(scorer)
+    for name, scorer in {**STAGE1_SCORERS, **STAGE2_SCORERS}.items()
+}
+
+STAGE_THRESHOLD = 0.5
+STAGE1_WORKERS = None  # ThreadPoolExecutor default
+STAGE2_WORKERS = 10
+
+PROGRESS_EVENT = "progress"  # job_id slot of the progress events from iter_match_scores
+PROGRESS_INTERVAL = 0.5  # seconds between progress events
 
 ###############################################################################
-# Helper: Process Stage 2 for a chunk of job descriptions
+# Stage pools, shared by every search in the process: concurrent searches
+# queue for these threads instead of each starting its own pools.
+###############################################################################
+def start_stage_executors():
+    global stage1_executor, stage2_executor
+    stage1_executor = ThreadPoolExecutor(max_workers=STAGE1_WORKERS, thread_name_prefix="mirra-stage1")
+    stage2_executor = ThreadPoolExecutor(max_workers=STAGE2_WORKERS, thread_name_prefix="mirra-stage2")
+
+start_stage_executors()
+# A forked child (e.g. a LocalShardPool worker with context="fork") has none of
+# the parent's pool threads, so it gets pools of its own.
+os.register_at_fork(after_in_child=start_stage_executors)
+
 ###############################################################################
-def process_stage2(job_chunk, candidate_resume_JSON):
+# Helper: Run one stage's scorers for a single job
+###############################################################################
+def run_stage(scorers, job, candidate_resume_JSON, score_cache=None, cached_only=False):
     """
-    For the given chunk of job descriptions, calculate the three Stage 2 scores,
-    then merge them into a single dictionary.
+    Runs every scorer in `scorers` against a single job, then merges and filters
+    the results the same way the whole-list stages do.
+
+    With a score_cache (a BoundScoreStore), each scorer's result is read from
+    it when present and written back after computing it. With cached_only,
+    returns MISSING instead of running a scorer that has no cached result.
+
+    Returns the merged score dict for the job, or None if the job was filtered out.
     """
-    responsibilities_score = calculate_responsibilities_scores(
-        job_json_list=job_chunk, resume_json=candidate_resume_JSON
-    )
-    mandatory_skills_scores = calculate_mandatory_skill_scores(
-        job_json_list=job_chunk, resume_json=candidate_resume_JSON
-    )
-    preferred_skills_scores = calculate_preferred_skill_scores(
-        job_json_list=job_chunk, resume_json=candidate_resume_JSON
-    )
-    # Merge the three sets of scores for this chunk.
-    merged_chunk = merge_scores_by_job_id(
-        responsibilities_score,
-        mandatory_skills_scores,
-        preferred_skills_scores,
-        filter=True,
-        threshold=0.5,
-    )
-    return merged_chunk
+    job_list = [job]
+    job_id = job.get("job_id")
+    score_dicts = []
+    for name, scorer in scorers.items():
+        value = score_cache.get(name, job) if score_cache is not None else MISSING
+        if value is MISSING:
+            if cached_only:
+                return MISSING
+            value = scorer(job_list, candidate_resume_JSON).get(job_id)
+            if score_cache is not None:
+                score_cache.put(name, job, value)
+        score_dicts.append({job_id: value})
+    merged = merge_scores_by_job_id(*score_dicts, filter=True, threshold=STAGE_THRESHOLD)
+    return merged.get(job_id)
+
+def process_stage1(job, candidate_resume_JSON, score_cache=None):
+    """Education, credentials and background scores for one job (filter only)."""
+    return run_stage(STAGE1_SCORERS, job, candidate_resume_JSON, score_cache)
+
+def process_stage2(job, candidate_resume_JSON, score_cache=None):
+    """Responsibilities, mandatory and preferred skill scores for one job."""
+    return run_stage(STAGE2_SCORERS, job, candidate_resume_JSON, score_cache)
+
+def make_job_overall_scores(job_id, stage2_scores):
+    """Final overall scores for a single job that passed Stage 2."""
+    return make_overall_scores({job_id: stage2_scores})[0][1]
+
+def finish_job(job_id, stage2_scores, overall_scores=True):
+    """Stage 3 for one job, or the Stage 2 scores as they are if overall_scores is False."""
+    if not overall_scores:
+        return stage2_scores
+    return make_job_overall_scores(job_id, stage2_scores)
+
+def score_job_from_cache(job, candidate_resume_JSON, score_cache, overall_scores=True):
+    """
+    The job's match_scores (or None if filtered out) built from cached scorer
+    results only, or MISSING if any scorer it needs has not been cached.
+    """
+    stage1_scores = run_stage(STAGE1_SCORERS, job, candidate_resume_JSON, score_cache, cached_only=True)
+    if stage1_scores is None or stage1_scores is MISSING:
+        return stage1_scores
+    stage2_scores = run_stage(STAGE2_SCORERS, job, candidate_resume_JSON, score_cache, cached_only=True)
+    if stage2_scores is None or stage2_scores is MISSING:
+        return stage2_scores
+    return finish_job(job.get("job_id"), stage2_scores, overall_scores)
+
+###############################################################################
+# Helper: Per-job streaming pipeline
+###############################################################################
+def iter_pipeline(
+    job_desc_json_lst,
+    candidate_resume_JSON,
+    parallel_processing=True,
+    score_cache=None,
+    overall_scores=True,
+):
+    """
+    Yields (job, match_scores) for each job in completion order. match_scores is
+    None for jobs that were filtered out in Stage 1 or Stage 2.
+
+    `job_desc_json_lst` may be any iterable of jobs, e.g. a generator fed by
+    PineconeDatabase.search_stream; jobs are scored as they come.
+
+    With parallel_processing, every job is submitted to the Stage 1 pool as soon
+    as it is read and a job that passes Stage 1 goes straight into the Stage 2
+    pool, so the two stages overlap instead of waiting on each other. Overall
+    scores are computed as soon as a job's Stage 2 scores are ready.
+
+    With a score_cache (a SQLiteScoreStore), jobs whose scorer
+    results are all cached for this resume are yielded right away without
+    touching the pools.
+
+    With overall_scores=False, Stage 3 is skipped and match_scores are the raw
+    Stage 2 scores, for callers that compute overall scores for all jobs at
+    once (see ScoreTable.with_overall_scores).
+    """
+    if score_cache is None:
+        yield from iter_bound_pipeline(
+            job_desc_json_lst, candidate_resume_JSON, parallel_processing,
+            overall_scores=overall_scores,
+        )
+        return
+
+    score_cache = score_cache.bind(candidate_resume_JSON, SCORER_VERSIONS)
+    try:
+        yield from iter_bound_pipeline(
+            job_desc_json_lst, candidate_resume_JSON, parallel_processing, score_cache,
+            overall_scores,
+        )
+    finally:
+        score_cache.flush()
+
+def iter_bound_pipeline(
+    job_desc_json_lst,
+    candidate_resume_JSON,
+    parallel_processing,
+    score_cache=None,
+    overall_scores=True,
+):
+    """iter_pipeline with the score cache (if any) already bound to the resume."""
+    if not parallel_processing:
+        for job in job_desc_json_lst:
+            if process_stage1(job, candidate_resume_JSON, score_cache) is None:
+                yield job, None
+                continue
+            stage2_scores = process_stage2(job, candidate_resume_JSON, score_cache)
+            if stage2_scores is None:
+                yield job, None
+                continue
+            yield job, finish_job(job.get("job_id"), stage2_scores, overall_scores)
+        return
+
+    # Finished futures report here, so results are yielded while the job list
+    # is still being read
+    completed = queue.SimpleQueue()
+    outstanding = set()
+
+    def submit(executor, stage, process, job):
+        future = executor.submit(process, job, candidate_resume_JSON, score_cache)
+        outstanding.add(future)
+        future.add_done_callback(lambda future: completed.put((stage, job, future)))
+
+    def finish(stage, job, future):
+        outstanding.discard(future)
+        scores = future.result()
+        if scores is None:
+            yield job, None
+        elif stage == 1:
+            submit(stage2_executor, 2, process_stage2, job)
+        else:
+            yield job, finish_job(job.get("job_id"), scores, overall_scores)
+
+    try:
+        for job in job_desc_json_lst:
+            if score_cache is not None:
+                match_scores = score_job_from_cache(
+                    job, candidate_resume_JSON, score_cache, overall_scores
+                )
+                if match_scores is not MISSING:
+                    yield job, match_scores
+                    continue
+            submit(stage1_executor, 1, process_stage1, job)
+            while not completed.empty():
+                yield from finish(*completed.get())
+        while outstanding:
+            yield from finish(*completed.get())
+    finally:
+        # If the consumer stops early, drop this search's work that has not
+        # started yet and wait for the jobs already running.
+        for future in outstanding:
+            future.cancel()
+        wait(outstanding)
 
 # Covert Back to Scalar
 def convert_numpy_scalars(obj):
@@ -63,226 +244,270 @@ def convert_numpy_scalars(obj):
     else:
         return obj    
 
+def rank_match_records(records, positions):
+    """
+    Computes the overall scores of every job at once and sorts the jobs by
+    overall score, dropping jobs without one.
+
+    `records` are (job_id, Stage 2 scores) pairs and `positions` the position of
+    each job in the job list. Jobs finish in any order, so ties keep the input
+    order to stay deterministic.
+
+    Returns [(position, job_id, match_scores)] with native floats.
+    """
+    table = ScoreTable.from_records(records).with_overall_scores()
+    positions = np.asarray(positions, dtype=np.intp)
+    order = table.ranking(tiebreak=positions)
+    return [
+        (position, job_id, match_scores)
+        for position, (job_id, match_scores) in zip(
+            positions[order].tolist(), table.records(order)
+        )
+    ]
+
+def rank_match_results(job_desc_json_lst, records, positions, compact=False):
+    """
+    Ranks the scored jobs (see rank_match_records) and attaches match_scores to
+    them. With compact, returns [(job_id, match_scores)] instead and leaves the
+    job dicts untouched.
+    """
+    ranked = rank_match_records(records, positions)
+    print(f"[calculate_match_score] Total Length after Stage 2: {len(ranked)}")
+    if compact:
+        return [(job_id, match_scores) for _, job_id, match_scores in ranked]
+    match_results = []
+    for position, _, match_scores in ranked:
+        job = job_desc_json_lst[position]
+        job["match_scores"] = match_scores
+        match_results.append(job)
+    return match_results
+
+def coarse_filter(job_desc_json_lst, candidate_resume_JSON, top_fraction=None, cutoff=None,
+                  coarse_vectors=None):
+    """The jobs that pass the coarse pass (see utils/coarse_scores.py), in input order."""
+    scores = coarse_scores(job_desc_json_lst, candidate_resume_JSON, coarse_vectors)
+    keep = select_coarse(scores, top_fraction, cutoff)
+    print(f"[calculate_match_score] Coarse pass kept {len(keep)} of {len(job_desc_json_lst)} jobs")
+    return [job_desc_json_lst[i] for i in keep.tolist()]
+
+###############################################################################
+# Streaming API: yield each job's match scores as soon as it is done
+###############################################################################
+def iter_match_scores(
+    job_desc_json_lst,
+    candidate_resume_JSON,
+    parallel_processing=True,
+    progress_interval=PROGRESS_INTERVAL,
+    score_cache=None,
+    overall_scores=True,
+):
+    """
+    Yields (job_id, match_scores) for every job that survives all stages, in the
+    order the jobs finish.
+
+    Interleaved with those, it yields (PROGRESS_EVENT, progress) at most every
+    `progress_interval` seconds and once more at the end, where progress is:
+      {"total": ..., "scored": ..., "rejected": ..., "remaining": ...}
+
+    Jobs filtered out in Stage 1 or Stage 2, or left without an overall score,
+    count as rejected and are not yielded. The job dicts are not modified.
+
+    `job_desc_json_lst` may be a generator (see iter_pipeline); "total" is
+    then the number of jobs read so far.
+
+    `score_cache` (e.g. the SQLiteScoreStore app.py shares) is passed through to
+    iter_pipeline so previously scored jobs are not scored again.
+
+    With overall_scores=False the yielded scores are the raw Stage 2 scores
+    (NumPy scalars included) and jobs without any score count as rejected,
+    which matches the overall_score rule for positive weights.
+    """
+    size = len(job_desc_json_lst) if hasattr(job_desc_json_lst, "__len__") else None
+    read = 0
+    scored = 0
+    rejected = 0
+
+    def counted(jobs):
+        nonlocal read
+        for job in jobs:
+            read += 1
+            yield job
+
+    def progress():
+        total = size if size is not None else read
+        return {
+            "total": total,
+            "scored": scored,
+            "rejected": rejected,
+            "remaining": total - scored - rejected,
+        }
+
+    last_progress = time.monotonic()
+    for job, match_scores in iter_pipeline(
+        counted(job_desc_json_lst),
+        candidate_resume_JSON,
+        parallel_processing=parallel_processing,
+        score_cache=score_cache,
+        overall_scores=overall_scores,
+    ):
+        if not overall_scores:
+            if match_scores is None or not has_any_score(match_scores):
+                rejected += 1
+            else:
+                scored += 1
+                yield job.get("job_id"), match_scores
+        elif match_scores is None or match_scores.get("overall_score") is None:
+            rejected += 1
+        else:
+            scored += 1
+            yield job.get("job_id"), convert_numpy_scalars(match_scores)
+
+        now = time.monotonic()
+        if now - last_progress >= progress_interval:
+            last_progress = now
+            yield PROGRESS_EVENT, progress()
+
+    yield PROGRESS_EVENT, progress()
+
 ###############################################################################
 # Main Function: Calculate Match Score
 ###############################################################################
-def calculate_match_score(job_desc_json_lst, candidate_resume_JSON, parallel_processing=True):
+def calculate_match_score(
+    job_desc_json_lst,
+    candidate_resume_JSON,
+    parallel_processing=True,
+    on_progress=None,
+    score_cache=None,
+    compact=False,
+    coarse_top_fraction=None,
+    coarse_cutoff=None,
+    on_match=None,
+    coarse_vectors=None,
+):
     """
     Calculates match scores.
-    
-    Stage 1: Calculate component scores (6 tasks) in parallel (if enabled).
-    Stage 1.5: Merge and filter Stage 1 scores.
-    Stage 2: Break up the job list into 10 chunks and compute additional dimension scores
-             (responsibilities, mandatory skills, preferred skills) in parallel.
-    Stage 2.5: Merge the Stage 2 results.
-    Stage 3: Compute final overall scores and attach them to each job.
+
+    Stage 1: Calculate the six education, credentials and background scores for a
+             job and drop it if any of them falls below the threshold.
+    Stage 2: Calculate the responsibilities, mandatory skills and preferred skills
+             scores for a job that passed Stage 1, with the same filtering.
+    Stage 3: Compute the final overall scores of all surviving jobs in one
+             vectorized pass and attach them to the jobs.
+
+    This collects iter_match_scores into the job list sorted by overall score.
+    `on_progress`, if given, is called with each progress event. `score_cache`
+    memoizes scorer results across calls (see match_alogorithm.utils.score_cache).
+
+    `on_match`, if given, is called with (job_id, match_scores) for each job as
+    soon as it passes Stage 2, overall scores included (computed for that job
+    alone), so the first matches can be shown while the rest are scored.
+
+    With compact=True, returns [(job_id, match_scores)] instead of the job
+    dicts, which are left unmodified; job details for the rows being shown can
+    be fetched from utils.job_store by job_id.
+
+    `job_desc_json_lst` may be a generator of jobs (e.g. looked up page by page
+    from PineconeDatabase.search_stream); scoring starts on the first job.
+
+    With coarse_top_fraction and/or coarse_cutoff, a cheap approximate score is
+    computed for every job first and only the best fraction of the jobs, or
+    those scoring at least the cutoff, go through Stage 1 and Stage 2 (the job
+    list is read in full before scoring starts). Pass the job corpus's
+    coarse_vectors (a CoarseVectors built with the job store or the shards)
+    so the pass only embeds the resume's terms; without them it embeds every
+    job's terms and costs about as much as it saves.
+
+    Both settings are off by default, so every job is scored exactly. Turning
+    them on trades recall for latency: the coarse score is a rough proxy and
+    can rank jobs that would make the top 10 below the first half (on sample
+    data coarse_top_fraction=0.5 has kept as few as 5 of the exact top 10).
+    Check a setting with measure_coarse_recall on sample resumes before using
+    it, and keep the fraction high (e.g. 0.75 or more) unless it shows high
+    recall.
     """
     print("[calculate_match_score] START")
 
-    print(f"[calculate_match_score] Total Length of Sample: {len(job_desc_json_lst)}")
-    print(f"[calculate_match_score] parallel_processing={parallel_processing}")
-
-    # Test Pinecone connection
-    PINECONE_API_KEY = (
-        "pcsk_7VkStS_ifR3SH9d1MSkkju9kP7DUt5M16CpNyzi9dwNBm7iUqyXmbKZWQbC55ZzfSEaAB"
-    )
-    PINECONE_ENVIRONMENT = "us-east-1"
-    PINECONE_INDEX_NAME = "sample-100-strings"  # Must match an existing index or be created
-    
-    try:
-        # Instantiate Pinecone client and get the index
-        pc = Pinecone(api_key=PINECONE_API_KEY, environment=PINECONE_ENVIRONMENT)
-        pinecone_index = pc.Index(PINECONE_INDEX_NAME)
-        print("Pinecone connected successfully!")
-    except Exception as e:
-        # If any error occurs, print it and fallback to None
-        print("Error connecting to Pinecone, proceeding without it:", str(e))
-        pc = None
-        pinecone_index = None
-
-    # ================================================================
-    # Stage 1: Calculate component scores (6 tasks)
-    # ================================================================
-    print("[calculate_match_score] Stage 1: Start")
-    if parallel_processing:
-        print("[calculate_match_score] Stage 1: Submitting tasks to ThreadPoolExecutor...")
-        with ThreadPoolExecutor() as executor:
-            futures_stage1 = {
-                "mandatory_credentials": executor.submit(
-                    calculate_mandatory_credentials_scores,
-                    job_desc_json_lst,
-                    candidate_resume_JSON,
-                ),
-                "preferred_credentials": executor.submit(
-                    calculate_preferred_credentials_scores,
-                    job_desc_json_lst,
-                    candidate_resume_JSON,
-                ),
-                "mandatory_education": executor.submit(
-                    calculate_mandatory_education_scores,
-                    job_desc_json_lst,
-                    candidate_resume_JSON,
-                ),
-                "preferred_education": executor.submit(
-                    calculate_preferred_education_scores,
-                    job_desc_json_lst,
-                    candidate_resume_JSON,
-                ),
-                "mandatory_background": executor.submit(
-                    calculate_mandatory_background_scores,
-                    job_desc_json_lst,
-                    candidate_resume_JSON,
-                ),
-                "preferred_background": executor.submit(
-                    calculate_preferred_background_scores,
-                    job_desc_json_lst,
-                    candidate_resume_JSON,
-                ),
-            }
-            print("[calculate_match_score] Stage 1: Waiting for all futures...")
-            mandatory_credentials_scores = futures_stage1["mandatory_credentials"].result()
-            print("[calculate_match_score] Got mandatory_credentials_scores")
-            preferred_credentials_scores = futures_stage1["preferred_credentials"].result()
-            print("[calculate_match_score] Got preferred_credentials_scores")
-            mandatory_education_scores = futures_stage1["mandatory_education"].result()
-            print("[calculate_match_score] Got mandatory_education_scores")
-            preferred_education_scores = futures_stage1["preferred_education"].result()
-            print("[calculate_match_score] Got preferred_education_scores")
-            mandatory_background_scores = futures_stage1["mandatory_background"].result()
-            print("[calculate_match_score] Got mandatory_background_scores")
-            preferred_background_scores = futures_stage1["preferred_background"].result()
-            print("[calculate_match_score] Got preferred_background_scores")
-    else:
-        print("[calculate_match_score] Stage 1: Running tasks line by line...")
-        mandatory_credentials_scores = calculate_mandatory_credentials_scores(
-            job_desc_json_lst, candidate_resume_JSON
-        )
-        print("[calculate_match_score] Finished mandatory_credentials_scores")
-        preferred_credentials_scores = calculate_preferred_credentials_scores(
-            job_desc_json_lst, candidate_resume_JSON
-        )
-        print("[calculate_match_score] Finished preferred_credentials_scores")
-        mandatory_education_scores = calculate_mandatory_education_scores(
-            job_desc_json_lst, candidate_resume_JSON
-        )
-        print("[calculate_match_score] Finished mandatory_education_scores")
-        preferred_education_scores = calculate_preferred_education_scores(
-            job_desc_json_lst, candidate_resume_JSON
+    if coarse_top_fraction is not None or coarse_cutoff is not None:
+        job_desc_json_lst = coarse_filter(
+            list(job_desc_json_lst), candidate_resume_JSON, coarse_top_fraction, coarse_cutoff,
+            coarse_vectors,
         )
-        print("[calculate_match_score] Finished preferred_education_scores")
-        mandatory_background_scores = calculate_mandatory_background_scores(
-            job_desc_json_lst, candidate_resume_JSON
-        )
-        print("[calculate_match_score] Finished mandatory_background_scores")
-        preferred_background_scores = calculate_preferred_background_scores(
-            job_desc_json_lst, candidate_resume_JSON
-        )
-        print("[calculate_match_score] Finished preferred_background_scores")
-
-    print("[calculate_match_score] Stage 1 complete. Merging results...")
-    stage1_scores = merge_scores_by_job_id(
-        mandatory_background_scores,
-        preferred_background_scores,
-        mandatory_education_scores,
-        preferred_education_scores,
-        mandatory_credentials_scores,
-        preferred_credentials_scores,
-        filter=True,
-        threshold=0.5,
-    )
-    print("[calculate_match_score] Stage 1.5: Merged scores from Stage 1")
+    sized = hasattr(job_desc_json_lst, "__len__")
+    if sized:
+        print(f"[calculate_match_score] Total Length of Sample: {len(job_desc_json_lst)}")
+    print(f"[calculate_match_score] parallel_processing={parallel_processing}")
 
-    # Filter the job list to only those that passed Stage 1.
-    stage_job_desc_json_lst = [
-        job for job in job_desc_json_lst if job.get("job_id") in set(stage1_scores.keys())
-    ]
-    print(f"[calculate_match_score] Total Length after Stage 1: {len(stage_job_desc_json_lst)}")
-
-    # ================================================================
-    # Stage 2: Additional dimension scoring (3 tasks)
-    # ================================================================
-    print("[calculate_match_score] Stage 2: Start")
-    if parallel_processing:
-        print("[calculate_match_score] Stage 2: Splitting jobs into 10 chunks and submitting tasks...")
-        num_chunks = 10
-        job_chunks = chunk_list(stage_job_desc_json_lst, num_chunks)
-        with ThreadPoolExecutor(max_workers=num_chunks) as executor:
-            futures_stage2 = [
-                executor.submit(process_stage2, chunk, candidate_resume_JSON)
-                for chunk in job_chunks
-            ]
-            print("[calculate_match_score] Stage 2: Waiting for all futures...")
-            results_list = [f.result() for f in futures_stage2]
-    else:
-        print("[calculate_match_score] Stage 2: Running tasks line by line...")
-        responsibilities_score = calculate_responsibilities_scores(
-            job_json_list=stage_job_desc_json_lst, resume_json=candidate_resume_JSON
-        )
-        print("[calculate_match_score] Finished responsibilities_score")
-        mandatory_skills_scores = calculate_mandatory_skill_scores(
-            job_json_list=stage_job_desc_json_lst, resume_json=candidate_resume_JSON
-        )
-        print("[calculate_match_score] Finished mandatory_skills_scores")
-        preferred_skills_scores = calculate_preferred_skill_scores(
-            job_json_list=stage_job_desc_json_lst, resume_json=candidate_resume_JSON
-        )
-        print("[calculate_match_score] Finished preferred_skills_scores")
-        results_list = [
-            merge_scores_by_job_id(
-                responsibilities_score,
-                mandatory_skills_scores,
-                preferred_skills_scores,
-                filter=True,
-                threshold=0.5,
-            )
-        ]
-
-    # Merge all Stage 2 chunk results into one dictionary.
-    stage2_scores = reduce(
-        lambda a, b: merge_scores_by_job_id(a, b, filter=True, threshold=0.5),
-        results_list,
-    )
-    print("[calculate_match_score] Stage 2.5: Merged scores from Stage 2")
+    jobs = job_desc_json_lst if sized else []
+    positions = {}
+    for i, job in enumerate(jobs):
+        positions.setdefault(job.get("job_id"), i)
 
-    final_job_desc_json_lst = [
-        job for job in stage_job_desc_json_lst if job.get("job_id") in stage2_scores
-    ]
-    print(f"[calculate_match_score] Total Length after Stage 2: {len(final_job_desc_json_lst)}")
+    def collected(job_iter):
+        # Remember streamed jobs and their positions as they are read
+        for job in job_iter:
+            positions.setdefault(job.get("job_id"), len(jobs))
+            jobs.append(job)
+            yield job
 
-    # ================================================================
-    # Stage 3: Final overall score calculation
-    # ================================================================
-    print("[calculate_match_score] Stage 3: Computing overall scores...")
-    overall_scores = make_overall_scores(stage2_scores)
-    overall_scores = dict(overall_scores)
+    print("[calculate_match_score] Running Stage 1 -> Stage 2 pipeline...")
+    records = []
+    record_positions = []
+    for job_id, match_scores in iter_match_scores(
+        job_desc_json_lst if sized else collected(job_desc_json_lst),
+        candidate_resume_JSON,
+        parallel_processing=parallel_processing,
+        score_cache=score_cache,
+        overall_scores=False,
+    ):
+        if job_id == PROGRESS_EVENT:
+            if on_progress is not None:
+                on_progress(match_scores)
+            continue
+        records.append((job_id, match_scores))
+        record_positions.append(positions[job_id])
+        if on_match is not None:
+            on_match(job_id, convert_numpy_scalars(make_job_overall_scores(job_id, match_scores)))
 
-    print("[calculate_match_score] Attaching match_scores to each job...")
-    match_results = []
-    for job in final_job_desc_json_lst:
-        job_id = job.get("job_id")
-        print(f"[calculate_match_score] Processing job_id: {job_id}")
-        if job_id in overall_scores:
-            job["match_scores"] = overall_scores[job_id]
-            match_results.append(job)
-            print(f"[calculate_match_score] Attached match_scores for job_id: {job_id}")
-
-    print("[calculate_match_score] Sorting results by overall match score...")
-    # Filter out any None values from match_results, if needed.
-    match_results = [job for job in match_results if job.get("match_scores", {}).get("overall_score") is not None]
-    
-    match_results = sorted(
-        match_results,
-        key=lambda x: x.get("match_scores", {}).get("overall_score", 0),
-        reverse=True,
-    )
+    if not sized:
+        print(f"[calculate_match_score] Total Length of Sample: {len(jobs)}")
+    match_results = rank_match_results(jobs, records, record_positions, compact)
+    print("[calculate_match_score] DONE. Returning results.")
+    return match_results
 
-    converted_match_results = convert_numpy_scalars(match_results)
-    # print(converted_match_results)
-    # Optionally, if you want to check which jobs ended up with None, you could print error_job:
-    error_job = [job for job in match_results if job is None]
+def measure_coarse_recall(
+    job_desc_json_lst,
+    candidate_resume_JSON,
+    coarse_top_fraction=None,
+    coarse_cutoff=None,
+    top_k=50,
+    score_cache=None,
+    coarse_vectors=None,
+):
+    """
+    Recall@top_k of a coarse pass setting: the share of the exact top_k jobs
+    (every job through the full scorers) that the coarse pass would keep. This
+    costs a full scoring run; use it on sample resumes to tune the setting.
 
-    print("[calculate_match_score] DONE. Returning results.")
-    return converted_match_results
+    Returns {"total": ..., "kept": ..., "top_k": ..., "recall": ...}.
+    """
+    job_desc_json_lst = list(job_desc_json_lst)
+    scores = coarse_scores(job_desc_json_lst, candidate_resume_JSON, coarse_vectors)
+    kept = {
+        job_desc_json_lst[i].get("job_id")
+        for i in select_coarse(scores, coarse_top_fraction, coarse_cutoff).tolist()
+    }
+    exact = calculate_match_score(
+        job_desc_json_lst, candidate_resume_JSON, score_cache=score_cache, compact=True
+    )
+    top = [job_id for job_id, _ in exact[:top_k]]
+    report = {
+        "total": len(job_desc_json_lst),
+        "kept": len(kept),
+        "top_k": len(top),
+        "recall": sum(job_id in kept for job_id in top) / len(top) if top else 1.0,
+    }
+    print(f"[measure_coarse_recall] {report}")
+    return report
 
 ###############################################################################
 # MAIN
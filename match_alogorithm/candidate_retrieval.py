@@ -0,0 +1,78 @@
+from concurrent.futures import ThreadPoolExecutor
+
+# Imports
+from match_alogorithm.utils.embedding_prefetch import flatten_strings
+from match_alogorithm.utils.similarity_matrix import embed_terms, pooled_vector
+
+RETRIEVAL_TOP_N = 500  # jobs handed to calculate_match_score
+
+
+def resume_section_terms(resume_json):
+    """
+    The resume terms behind each pooled query vector:
+      skills           - the skill names
+      background       - professional backgrounds, industries and fields of study
+      responsibilities - the responsibility texts
+    """
+    skills = set()
+    for item in resume_json.get("skills", []):
+        skills.update(flatten_strings(item.get("skill", [])))
+    background = set()
+    for exp in resume_json.get("professional_background", []):
+        background.update(flatten_strings(exp.get("background", [])))
+        background.update(flatten_strings(exp.get("industry", [])))
+        background.update(flatten_strings(exp.get("field_of_study", [])))
+    for edu in resume_json.get("education", []):
+        background.update(flatten_strings(edu.get("major", [])))
+    responsibilities = set()
+    for item in resume_json.get("responsibilities", []):
+        responsibilities.update(flatten_strings(item.get("text", "")))
+    return {"skills": skills, "background": background, "responsibilities": responsibilities}
+
+
+def pooled_resume_vectors(resume_json):
+    """
+    {section: unit vector}, the mean of the section's term embeddings, for
+    every section of resume_section_terms with at least one term. The terms
+    are the ones the scorers embed anyway, so this also warms the embedding
+    cache for the detailed scoring.
+    """
+    vectors = {}
+    for section, terms in resume_section_terms(resume_json).items():
+        terms = {term for term in terms if term.strip()}
+        if terms:
+            _, term_vectors = embed_terms(terms)
+            vectors[section] = pooled_vector(term_vectors)
+    return vectors
+
+
+def retrieve_candidates(vector_database, resume_json, filters=None, top_n=RETRIEVAL_TOP_N):
+    """
+    The top_n jobs most relevant to the resume, for scoring when there is no
+    search keyword: each pooled resume vector queries the job-level index
+    (a PineconeDatabase or LocalVectorDatabase, through search_vector), and a
+    job's relevance is its best cosine over those queries.
+
+    Returns [{'id': job_id, 'score': cosine}] best first (ties by job_id), the
+    shape of a keyword search, so it can go to find_record_by_ids as is.
+    """
+    vectors = pooled_resume_vectors(resume_json)
+    if not vectors:
+        print("[retrieve_candidates] No resume terms to search with")
+        return []
+
+    with ThreadPoolExecutor(max_workers=len(vectors)) as executor:
+        results = list(executor.map(
+            lambda vector: vector_database.search_vector(vector, filters, top_n),
+            vectors.values(),
+        ))
+
+    best = {}
+    for matches in results:
+        for match in matches:
+            job_id, score = match['id'], match['score']
+            if job_id not in best or score > best[job_id]:
+                best[job_id] = score
+    ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))[:top_n]
+    print(f"[retrieve_candidates] {len(ranked)} jobs from {len(vectors)} pooled resume vectors")
+    return [{'id': job_id, 'score': score} for job_id, score in ranked]
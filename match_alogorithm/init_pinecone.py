@@ -1,4 +1,4 @@
-from pinecone import Pinecone
+from utils.clients import get_client, pinecone_index
 
 PINECONE_API_KEY = (
     "pcsk_7VkStS_ifR3SH9d1MSkkju9kP7DUt5M16CpNyzi9dwNBm7iUqyXmbKZWQbC55ZzfSEaAB"
@@ -6,15 +6,22 @@ PINECONE_API_KEY = (
 PINECONE_ENVIRONMENT = "us-east-1"
 PINECONE_INDEX_NAME = "sample-100-strings" 
 
-try:
-    pc = Pinecone(api_key=PINECONE_API_KEY, environment=PINECONE_ENVIRONMENT)
-    pinecone_index = pc.Index(PINECONE_INDEX_NAME)
-    print("Pinecone connected successfully!")
-except Exception as e:
-    # If any error occurs, print it and fallback to None
-    print("Error connecting to Pinecone, proceeding without it:", str(e))
-    pc = None
-    pinecone_index = None
+def connect_pinecone_index():
+    try:
+        index = pinecone_index(PINECONE_API_KEY, PINECONE_INDEX_NAME)
+        print("Pinecone connected successfully!")
+        return index
+    except Exception as e:
+        # If any error occurs, print it and fallback to None
+        print("Error connecting to Pinecone, proceeding without it:", str(e))
+        return None
+
+def get_pinecone_index():
+    """
+    The index of stored term embeddings, connected on first use and shared by
+    the process; None if Pinecone could not be reached (not retried).
+    """
+    return get_client("string-index", connect_pinecone_index)
 
 embedding_cache = {}
 similarity_cache = {}
@@ -0,0 +1,189 @@
+import json
+import os
+import numpy as np
+
+# Imports
+from match_alogorithm.calculate_match_score import iter_pipeline
+from match_alogorithm.utils.coarse_scores import (
+    extract_job_skill_terms,
+    extract_resume_skill_terms,
+)
+from match_alogorithm.utils.embedding_prefetch import collect_job_terms, collect_resume_terms
+from match_alogorithm.utils.semantic_similarity import embedding_key, get_embedder
+from match_alogorithm.utils.similarity_matrix import (
+    TermSimilarityMatrix,
+    embed_terms,
+    pooled_vector,
+    use_similarity_matrix,
+)
+from match_alogorithm.utils.score_table import ScoreTable
+
+MAX_CANDIDATES = 200  # resumes that go through the full scorers per query
+
+
+###############################################################################
+# Resume-side index
+###############################################################################
+class ResumeIndex:
+    """
+    A pool of compiled resumes for ranking candidates against a single job.
+
+    For each resume it keeps the embeddings of every term the scorers use
+    (shared across resumes), a pooled resume vector, and an inverted index from
+    normalized skill terms to the resumes that list them. rank_candidates uses
+    the pooled vectors and the skill index to pick a shortlist, and only the
+    shortlist goes through the full scorers.
+    """
+
+    def __init__(self):
+        self.resume_ids = []
+        self.resumes = []
+        self.resume_terms = []  # term rows per resume
+        self.term_index = {}  # safe_id -> row in term_vectors
+        self.term_ids = []  # row in term_vectors -> safe_id
+        self.term_vectors = np.zeros((0, get_embedder().embedding_dimension), dtype=np.float32)
+        self.pooled_vectors = np.zeros((0, get_embedder().embedding_dimension), dtype=np.float32)
+        self.skill_postings = {}  # normalized skill term -> [resume position, ...]
+
+    def __len__(self):
+        return len(self.resume_ids)
+
+    def add_resumes(self, resumes):
+        """
+        Compiles and adds resumes. `resumes` is a dict {resume_id: resume_json}
+        or a list of (resume_id, resume_json). New terms are embedded in one batch.
+        """
+        items = list(resumes.items()) if isinstance(resumes, dict) else list(resumes)
+
+        new_terms = set()
+        for _, resume_json in items:
+            for term in collect_resume_terms(resume_json):
+                if embedding_key(term)[1] not in self.term_index:
+                    new_terms.add(term)
+        new_index, new_vectors = embed_terms(new_terms)
+        offset = len(self.term_vectors)
+        for safe_id, row in new_index.items():
+            self.term_index[safe_id] = offset + row
+            self.term_ids.append(safe_id)
+        self.term_vectors = np.vstack([self.term_vectors, new_vectors])
+
+        pooled = []
+        for resume_id, resume_json in items:
+            position = len(self.resume_ids)
+            rows = sorted(
+                {self.term_index[embedding_key(t)[1]] for t in collect_resume_terms(resume_json)}
+            )
+            self.resume_ids.append(resume_id)
+            self.resumes.append(resume_json)
+            self.resume_terms.append(rows)
+            pooled.append(pooled_vector(self.term_vectors[rows]))
+            for term in extract_resume_skill_terms(resume_json):
+                self.skill_postings.setdefault(term, []).append(position)
+        if pooled:
+            self.pooled_vectors = np.vstack([self.pooled_vectors, np.vstack(pooled)])
+        print(f"[ResumeIndex] {len(self)} resumes, {len(self.term_index)} terms")
+
+    ###########################################################################
+    # Persistence
+    ###########################################################################
+    def save(self, directory):
+        """Writes the compiled pool to `directory` (resumes.json + vectors.npz)."""
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "resumes.json"), "w") as f:
+            json.dump(
+                {
+                    "resume_ids": self.resume_ids,
+                    "resumes": self.resumes,
+                    "resume_terms": self.resume_terms,
+                    "term_index": self.term_index,
+                    "skill_postings": self.skill_postings,
+                },
+                f,
+            )
+        np.savez(
+            os.path.join(directory, "vectors.npz"),
+            term_vectors=self.term_vectors,
+            pooled_vectors=self.pooled_vectors,
+        )
+
+    @classmethod
+    def load(cls, directory):
+        index = cls()
+        with open(os.path.join(directory, "resumes.json")) as f:
+            data = json.load(f)
+        index.resume_ids = data["resume_ids"]
+        index.resumes = data["resumes"]
+        index.resume_terms = data["resume_terms"]
+        index.term_index = data["term_index"]
+        index.term_ids = sorted(index.term_index, key=index.term_index.get)
+        index.skill_postings = data["skill_postings"]
+        vectors = np.load(os.path.join(directory, "vectors.npz"))
+        index.term_vectors = vectors["term_vectors"]
+        index.pooled_vectors = vectors["pooled_vectors"]
+        return index
+
+    ###########################################################################
+    # Candidate ranking
+    ###########################################################################
+    def shortlist(self, job_json, job_pooled, max_candidates=MAX_CANDIDATES):
+        """
+        Positions of the resumes worth scoring in full: the best matches by
+        pooled-vector similarity plus the resumes sharing the most skill terms
+        with the job.
+        """
+        if len(self) <= max_candidates:
+            return list(range(len(self)))
+
+        vector_sims = self.pooled_vectors @ job_pooled
+        by_vector = np.argpartition(-vector_sims, max_candidates - 1)[:max_candidates]
+
+        hits = {}
+        for term in extract_job_skill_terms(job_json):
+            for position in self.skill_postings.get(term, []):
+                hits[position] = hits.get(position, 0) + 1
+        by_skill = sorted(hits, key=lambda p: (-hits[p], p))[:max_candidates]
+
+        return sorted(set(by_vector.tolist()) | set(by_skill))
+
+    def rank_candidates(self, job_json, top_n=10, max_candidates=MAX_CANDIDATES):
+        """
+        Returns the top_n resumes for `job_json` as a list of
+          {"resume_id": ..., "match_scores": {...}}
+        sorted by overall score, using the same scorers, stage filters and
+        make_overall_scores weights as calculate_match_score.
+
+        Only the resumes in the shortlist (see shortlist) are scored. Among
+        them, a resume is returned exactly when calculate_match_score keeps
+        the job for it; a resume left out of the shortlist is never returned,
+        even if it would have passed. With max_candidates or fewer resumes in
+        the index every resume is shortlisted, so the result is exact. The
+        matrix lookups return the same score types as the FAISS helpers (see
+        TermSimilarityMatrix.group_similarity), which the stage filter relies on.
+        """
+        col_index, col_vectors = embed_terms(collect_job_terms(job_json))
+        candidates = self.shortlist(job_json, pooled_vector(col_vectors), max_candidates)
+        print(f"[ResumeIndex] Scoring {len(candidates)} of {len(self)} resumes")
+
+        # One matrix product for every shortlisted resume's terms vs. the job's.
+        rows = sorted({row for p in candidates for row in self.resume_terms[p]})
+        row_index = {self.term_ids[row]: i for i, row in enumerate(rows)}
+        matrix = TermSimilarityMatrix.from_vectors(
+            row_index, self.term_vectors[rows], col_index, col_vectors
+        )
+
+        records = []
+        with use_similarity_matrix(matrix):
+            for position in candidates:
+                for _, stage2_scores in iter_pipeline(
+                    [job_json], self.resumes[position], parallel_processing=False,
+                    overall_scores=False,
+                ):
+                    if stage2_scores is not None:
+                        records.append((position, stage2_scores))
+
+        # Rows are in resume order, so ties keep the pool order.
+        table = ScoreTable.from_records(records).with_overall_scores()
+        return [
+            {"resume_id": self.resume_ids[position], "match_scores": match_scores}
+            for position, match_scores in table.records(table.ranking()[:top_n])
+        ]
@@ -0,0 +1,419 @@
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from queue import Empty
+import numpy as np
+import pandas as pd
+
+# Imports
+from match_alogorithm.calculate_match_score import calculate_match_score
+from match_alogorithm.init_pinecone import embedding_cache
+from match_alogorithm.utils.coarse_scores import CoarseVectors
+from match_alogorithm.utils.embedding_prefetch import collect_terms, prefetch_embeddings
+from match_alogorithm.utils.semantic_similarity import add_embeddings, embedding_key, embedding_to_numpy
+from utils.job_store import JOB_STORE_COLUMNS, JobStore
+from utils.local_vector_database import LocalVectorDatabase
+
+SHARD_TOP_K = 100  # results each shard returns and the coordinator keeps
+SHARD_RETRIEVE_K = 500  # jobs a shard scores when the request has a query vector
+SHARD_TIMEOUT = 60  # seconds a shard has to answer, from when the request is sent
+WORKER_CHECK_INTERVAL = 1  # seconds between liveness checks of the shard processes
+
+# Files of a shard directory (see build_shards)
+SHARD_JOBS_FILE = "jobs.parquet"  # job store file, JOB_STORE_COLUMNS
+SHARD_EMBEDDINGS_FILE = "embeddings.npz"  # embedding pack: safe_ids + vectors of the job terms
+SHARD_COARSE_FILE = "coarse.npz"  # CoarseVectors of the shard's jobs, for the coarse pass
+SHARD_INDEX_DIR = "index"  # optional LocalVectorDatabase over the shard's jobs
+
+
+def shard_for(job_id, n_shards):
+    """The shard a job belongs to; stable across processes and hosts."""
+    return zlib.crc32(str(job_id).encode("utf-8")) % n_shards
+
+
+def merge_shard_results(records, top_k=SHARD_TOP_K):
+    """
+    The top_k (job_id, match_scores) records by overall score, ties by job_id,
+    so the merged list does not depend on which shard answered first. A job
+    listed twice keeps its first record.
+    """
+    unique = {}
+    for job_id, match_scores in records:
+        unique.setdefault(job_id, match_scores)
+    ranked = sorted(unique.items(), key=lambda item: (-item[1]["overall_score"], item[0]))
+    return ranked[:top_k]
+
+
+###############################################################################
+# Building the shards
+###############################################################################
+def embedding_pack(job_list):
+    """(safe_ids, vectors) for every term the scorers embed from the jobs."""
+    terms = collect_terms(job_list)
+    prefetch_embeddings(terms)
+    safe_ids = sorted({embedding_key(term)[1] for term in terms})
+    if not safe_ids:
+        return np.array([], dtype=str), np.zeros((0, 0), dtype=np.float32)
+    vectors = np.vstack([embedding_to_numpy(embedding_cache[safe_id]) for safe_id in safe_ids])
+    return np.array(safe_ids), vectors
+
+
+def build_shards(job_store_file, output_dir, n_shards, vector_database=None, embed=True):
+    """
+    Splits a job store file (see utils/job_store.py) into n_shards shard
+    directories under output_dir, by shard_for(job_id). Each gets its jobs,
+    an embedding pack of their scorer terms (unless embed=False) and, if a
+    LocalVectorDatabase over the corpus is given, an index of its jobs.
+    With embed, the CoarseVectors of its jobs are saved as well.
+    Returns the shard directories.
+    """
+    frame = pd.read_parquet(job_store_file, columns=JOB_STORE_COLUMNS)
+    shards = np.array([shard_for(job_id, n_shards) for job_id in frame["job_id"]])
+    shard_dirs = []
+    for shard in range(n_shards):
+        shard_dir = os.path.join(output_dir, f"shard_{shard:03d}")
+        os.makedirs(shard_dir, exist_ok=True)
+        part = frame[shards == shard].reset_index(drop=True)
+        part.to_parquet(os.path.join(shard_dir, SHARD_JOBS_FILE), index=False)
+        if embed or vector_database is not None:
+            store = JobStore()
+            store.load_frame(part)
+        if embed:
+            safe_ids, vectors = embedding_pack(store.all_jobs())
+            np.savez(os.path.join(shard_dir, SHARD_EMBEDDINGS_FILE), safe_ids=safe_ids, vectors=vectors)
+            CoarseVectors.from_jobs(store.all_jobs()).save(os.path.join(shard_dir, SHARD_COARSE_FILE))
+        if vector_database is not None:
+            vector_database.subset(part["job_id"].tolist()).save(os.path.join(shard_dir, SHARD_INDEX_DIR))
+        print(f"[build_shards] {shard_dir}: {len(part)} jobs")
+        shard_dirs.append(shard_dir)
+    return shard_dirs
+
+
+###############################################################################
+# Worker: one shard
+###############################################################################
+class ShardWorker:
+    """
+    Serves match requests for one shard directory. The shard's jobs go into
+    their own JobStore and its embedding pack into the embedding cache, so
+    the scorers run without fetching job-side embeddings. Its CoarseVectors,
+    if built, serve the coarse pass.
+
+    A request is a JSON-compatible dict:
+      {"resume": resume_json,
+       "query_vector": [float, ...] or None,  # e.g. the keyword embedding
+       "filters": Pinecone-style filters or None,
+       "top_k": int, "retrieve_k": int,
+       "coarse_top_fraction": float or None, "coarse_cutoff": float or None}
+    and the response:
+      {"shard": name, "results": [[job_id, match_scores], ...], "scored": int, "elapsed": seconds}
+    """
+
+    def __init__(self, shard_dir):
+        self.name = os.path.basename(os.path.normpath(shard_dir))
+        self.store = JobStore()
+        self.store.load_parquet(os.path.join(shard_dir, SHARD_JOBS_FILE))
+        pack_path = os.path.join(shard_dir, SHARD_EMBEDDINGS_FILE)
+        if os.path.exists(pack_path):
+            pack = np.load(pack_path)
+            add_embeddings(pack["safe_ids"].tolist(), pack["vectors"])
+            print(f"[ShardWorker] {self.name}: {len(pack['safe_ids'])} packed embeddings")
+        coarse_path = os.path.join(shard_dir, SHARD_COARSE_FILE)
+        self.coarse_vectors = CoarseVectors.load(coarse_path) if os.path.exists(coarse_path) else None
+        index_dir = os.path.join(shard_dir, SHARD_INDEX_DIR)
+        self.index = LocalVectorDatabase.load(None, index_dir) if os.path.isdir(index_dir) else None
+
+    def select_jobs(self, request):
+        query_vector = request.get("query_vector")
+        filters = request.get("filters")
+        if query_vector is not None and self.index is not None:
+            matches = self.index.search_vector(
+                query_vector, filters, request.get("retrieve_k", SHARD_RETRIEVE_K)
+            )
+            return self.store.get_many(match["id"] for match in matches)
+        if filters:
+            return self.store.filter_jobs(filters)
+        return self.store.all_jobs()
+
+    def handle(self, request, on_progress=None):
+        """
+        Answers one request. `on_progress` is passed to calculate_match_score;
+        raising from it (see serve_shard) stops the scoring early.
+        """
+        start = time.monotonic()
+        jobs = self.select_jobs(request)
+        matches = calculate_match_score(
+            jobs,
+            request["resume"],
+            on_progress=on_progress,
+            compact=True,
+            coarse_top_fraction=request.get("coarse_top_fraction"),
+            coarse_cutoff=request.get("coarse_cutoff"),
+            coarse_vectors=self.coarse_vectors,
+        )
+        results = merge_shard_results(matches, request.get("top_k", SHARD_TOP_K))
+        return {
+            "shard": self.name,
+            "results": [[job_id, match_scores] for job_id, match_scores in results],
+            "scored": len(jobs),
+            "elapsed": time.monotonic() - start,
+        }
+
+
+class RequestCancelled(Exception):
+    """The coordinator gave up on the request a shard is working on."""
+
+
+def serve_shard(shard_dir, requests, responses, cancels):
+    """
+    Worker process loop: answers (request_id, request) items from `requests`
+    with (request_id, shard, response, error) on `responses`, until None.
+
+    Request ids put on `cancels` (the coordinator timed out on them) are
+    skipped if they have not started, and a request already being scored
+    stops at its next progress event, so a stale request does not hold up
+    the ones queued behind it.
+    """
+    worker = ShardWorker(shard_dir)
+    cancelled = set()
+
+    def listen():
+        while True:
+            request_id = cancels.get()
+            if request_id is None:
+                break
+            cancelled.add(request_id)
+
+    threading.Thread(target=listen, name="mirra-shard-cancels", daemon=True).start()
+    while True:
+        item = requests.get()
+        if item is None:
+            break
+        request_id, request = item
+
+        def check_cancelled(progress):
+            if request_id in cancelled:
+                raise RequestCancelled(request_id)
+
+        try:
+            check_cancelled(None)
+            responses.put((request_id, worker.name, worker.handle(request, check_cancelled), None))
+        except RequestCancelled:
+            print(f"[serve_shard] {worker.name}: skipped cancelled request {request_id}")
+        except Exception as e:
+            responses.put((request_id, worker.name, None, f"{type(e).__name__}: {e}"))
+        # Requests are handled in id order, so cancels up to this one are spent
+        cancelled.difference_update([i for i in list(cancelled) if i <= request_id])
+
+
+###############################################################################
+# Local transport: one worker process per shard
+###############################################################################
+class ShardError(Exception):
+    """A shard failed to answer a request."""
+
+
+class LocalShardPool:
+    """
+    Runs a serve_shard process per shard directory on this machine. shards()
+    returns a client per shard for ShardCoordinator; a client for a shard on
+    another host only needs the same submit(request) -> Future method.
+
+    A shard handles its requests one at a time, in order. A request the
+    caller gives up on (cancel) is skipped or stopped by its worker. A worker
+    process that exits fails its outstanding requests and every later one.
+    """
+
+    def __init__(self, shard_dirs, context="spawn"):
+        ctx = multiprocessing.get_context(context)
+        self.responses = ctx.Queue()
+        self.processes = {}
+        self.requests = {}
+        self.cancels = {}
+        for shard_dir in shard_dirs:
+            name = os.path.basename(os.path.normpath(shard_dir))
+            self.requests[name] = ctx.Queue()
+            self.cancels[name] = ctx.Queue()
+            self.processes[name] = ctx.Process(
+                target=serve_shard,
+                args=(shard_dir, self.requests[name], self.responses, self.cancels[name]),
+                name=f"mirra-{name}",
+                daemon=True,
+            )
+            self.processes[name].start()
+        self.pending = {}  # (request_id, shard) -> Future
+        self.dead = {}  # shard -> exit code of its worker process
+        self.closing = False
+        self.lock = threading.Lock()
+        self.request_ids = itertools.count()
+        self.dispatcher = threading.Thread(target=self.dispatch, name="mirra-shard-responses", daemon=True)
+        self.dispatcher.start()
+
+    def dispatch(self):
+        # Hands every response to the Future of its request; late answers to
+        # requests that timed out have no Future left and are dropped. Between
+        # responses, checks that the worker processes are still running.
+        while True:
+            try:
+                item = self.responses.get(timeout=WORKER_CHECK_INTERVAL)
+            except Empty:
+                self.check_workers()
+                continue
+            if item is None:
+                break
+            request_id, name, response, error = item
+            with self.lock:
+                future = self.pending.pop((request_id, name), None)
+            if future is None or not future.set_running_or_notify_cancel():
+                continue
+            if error is None:
+                future.set_result(response)
+            else:
+                future.set_exception(ShardError(f"{name}: {error}"))
+
+    def check_workers(self):
+        """Fails the outstanding requests of every shard whose process has exited."""
+        for name, process in self.processes.items():
+            if self.closing:
+                return
+            if name in self.dead or process.is_alive():
+                continue
+            with self.lock:
+                self.dead[name] = process.exitcode
+                failed = [key for key in self.pending if key[1] == name]
+                futures = [self.pending.pop(key) for key in failed]
+            print(f"[LocalShardPool] {name} worker exited with code {process.exitcode}")
+            for future in futures:
+                fail(future, ShardError(f"{name}: worker exited with code {process.exitcode}"))
+
+    def submit(self, name, request):
+        future = Future()
+        request_id = next(self.request_ids)
+        with self.lock:
+            if name in self.dead:
+                fail(future, ShardError(f"{name}: worker exited with code {self.dead[name]}"))
+                return future
+            self.pending[(request_id, name)] = future
+        self.requests[name].put((request_id, request))
+        return future
+
+    def cancel(self, name, future):
+        """Gives up on a submitted request: drops its Future and tells the worker to skip it."""
+        with self.lock:
+            keys = [key for key, pending in self.pending.items() if pending is future]
+            for key in keys:
+                del self.pending[key]
+        for request_id, _ in keys:
+            self.cancels[name].put(request_id)
+        future.cancel()
+
+    def shards(self):
+        """{shard name: client} for ShardCoordinator."""
+        return {name: LocalShardClient(self, name) for name in self.processes}
+
+    def close(self):
+        self.closing = True
+        for queue in self.requests.values():
+            queue.put(None)
+        for queue in self.cancels.values():
+            queue.put(None)
+        for process in self.processes.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.responses.put(None)
+        self.dispatcher.join(timeout=5)
+
+
+class LocalShardClient:
+    def __init__(self, pool, name):
+        self.pool = pool
+        self.name = name
+
+    def submit(self, request):
+        return self.pool.submit(self.name, request)
+
+    def cancel(self, future):
+        self.pool.cancel(self.name, future)
+
+
+def fail(future, error):
+    if future.set_running_or_notify_cancel():
+        future.set_exception(error)
+
+
+###############################################################################
+# Coordinator: fan out, gather, merge
+###############################################################################
+class ShardCoordinator:
+    """
+    Sends one match request to every shard and merges their top results with
+    merge_shard_results. Each shard has `timeout` seconds from when the
+    request is sent; shards that fail or time out are left out of the merge
+    and reported in "missing_shards". A timed-out request is cancelled through
+    the client's cancel(future), if it has one.
+    """
+
+    def __init__(self, shards, timeout=SHARD_TIMEOUT):
+        self.shards = shards  # {name: client with submit(request) -> Future [and cancel(future)]}
+        self.timeout = timeout
+
+    def match(self, resume, query_vector=None, filters=None, top_k=SHARD_TOP_K,
+              retrieve_k=SHARD_RETRIEVE_K, coarse_top_fraction=None, coarse_cutoff=None):
+        """
+        Returns {"results": [(job_id, match_scores)], "missing_shards": [...],
+        "scored": jobs scored across the shards that answered}.
+        """
+        request = {
+            "resume": resume,
+            "query_vector": None if query_vector is None else [float(x) for x in query_vector],
+            "filters": filters,
+            "top_k": top_k,
+            "retrieve_k": retrieve_k,
+            "coarse_top_fraction": coarse_top_fraction,
+            "coarse_cutoff": coarse_cutoff,
+        }
+        deadline = time.monotonic() + self.timeout
+        futures = {name: client.submit(request) for name, client in self.shards.items()}
+
+        records = []
+        missing = []
+        scored = 0
+        for name in sorted(futures):
+            try:
+                response = futures[name].result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeout:
+                cancel = getattr(self.shards[name], "cancel", None)
+                if cancel is not None:
+                    cancel(futures[name])
+                else:
+                    futures[name].cancel()
+                print(f"[ShardCoordinator] {name} timed out")
+                missing.append(name)
+                continue
+            except Exception as e:
+                print(f"[ShardCoordinator] {name} failed:", str(e))
+                missing.append(name)
+                continue
+            records.extend((job_id, match_scores) for job_id, match_scores in response["results"])
+            scored += response["scored"]
+
+        results = merge_shard_results(records, top_k)
+        print(f"[ShardCoordinator] {len(results)} results from {len(futures) - len(missing)} of {len(futures)} shards")
+        return {"results": results, "missing_shards": missing, "scored": scored}
+
+
+###############################################################################
+# MAIN: split a job store file into shards
+#   python -m match_alogorithm.sharded_match <jobs.parquet> <output directory> <shards> [<local index directory>]
+###############################################################################
+if __name__ == "__main__":
+    import sys
+
+    job_store_file, output_dir, n_shards = sys.argv[1], sys.argv[2], int(sys.argv[3])
+    vector_database = LocalVectorDatabase.load(None, sys.argv[4]) if len(sys.argv) > 4 else None
+    build_shards(job_store_file, output_dir, n_shards, vector_database)
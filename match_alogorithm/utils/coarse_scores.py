@@ -0,0 +1,215 @@
+# coarse_scores.py
+import math
+import numpy as np
+from match_alogorithm.utils.embedding_prefetch import flatten_strings
+from match_alogorithm.utils.semantic_similarity import embedding_key, get_embedder
+from match_alogorithm.utils.similarity_matrix import embed_terms, pooled_vector
+from utils.job_store import JobStore
+
+# coarse score = VECTOR_WEIGHT * pooled section cosine + SKILL_WEIGHT * skill overlap
+COARSE_VECTOR_WEIGHT = 0.7
+COARSE_SKILL_WEIGHT = 0.3
+
+
+########################################################################
+# SKILL TERMS
+########################################################################
+def normalize_skill_term(term):
+    return term.strip().lower()
+
+
+def extract_resume_skill_terms(resume_json):
+    terms = set()
+    for item in resume_json.get("skills", []):
+        terms.update(normalize_skill_term(t) for t in flatten_strings(item.get("skill", [])))
+    return terms
+
+
+def extract_job_skill_terms(job_json):
+    terms = set()
+    for level in ("mandatory", "preferred"):
+        for req in job_json.get(level, {}).get("hard_skills", []):
+            terms.update(normalize_skill_term(t) for t in flatten_strings(req.get("skill", [])))
+    return terms
+
+
+def skill_overlap(job_json, resume_skills):
+    """Share of the job's skill terms the resume lists word for word (0 if it has none)."""
+    job_skills = extract_job_skill_terms(job_json)
+    if not job_skills:
+        return 0.0
+    return len(job_skills & resume_skills) / len(job_skills)
+
+
+########################################################################
+# SECTION VECTORS
+# Per job, one pooled vector per section: the unit-normalized mean of the
+# section's term embeddings (zeros if it has none). A job's vectors depend
+# only on the job, so they are built once with the job store or the shards
+# (CoarseVectors) and a request only embeds the resume's terms.
+########################################################################
+COARSE_SECTIONS = ("skills", "responsibilities", "qualifications")
+
+
+def job_section_terms(job_json):
+    """{section: terms} of a job, over the same terms collect_job_terms gives the scorers."""
+    sections = {section: set() for section in COARSE_SECTIONS}
+    for level in ("mandatory", "preferred"):
+        section = job_json.get(level, {})
+        for req in section.get("hard_skills", []):
+            sections["skills"].update(flatten_strings(req.get("skill", [])))
+        for req in section.get("credentials", []):
+            sections["qualifications"].update(flatten_strings(req.get("credential", [])))
+        for req in section.get("education", []):
+            sections["qualifications"].update(flatten_strings(req.get("field_of_study", [])))
+        for req in section.get("professional_background", []):
+            sections["qualifications"].update(flatten_strings(req.get("background", [])))
+            sections["qualifications"].update(flatten_strings(req.get("industry", [])))
+    for resp in job_json.get("responsibility", {}).get("responsibilities", []):
+        sections["responsibilities"].update(flatten_strings(resp.get("text", "")))
+    return sections
+
+
+def resume_section_terms(resume_json):
+    """{section: terms} of a resume, over the same terms collect_resume_terms gives the scorers."""
+    sections = {section: set() for section in COARSE_SECTIONS}
+    for item in resume_json.get("skills", []):
+        sections["skills"].update(flatten_strings(item.get("skill", [])))
+    for item in resume_json.get("responsibilities", []):
+        sections["responsibilities"].update(flatten_strings(item.get("text", "")))
+    for item in resume_json.get("credentials", []):
+        sections["qualifications"].update(flatten_strings(item.get("credential", [])))
+    for edu in resume_json.get("education", []):
+        sections["qualifications"].update(flatten_strings(edu.get("major", [])))
+    for exp in resume_json.get("professional_background", []):
+        sections["qualifications"].update(flatten_strings(exp.get("field_of_study", [])))
+        sections["qualifications"].update(flatten_strings(exp.get("background", [])))
+        sections["qualifications"].update(flatten_strings(exp.get("industry", [])))
+    return sections
+
+
+def section_vectors(section_terms_list):
+    """
+    (n, len(COARSE_SECTIONS), dim) float32 pooled section vectors for a list
+    of {section: terms}. Every term is embedded once, in one batch.
+    """
+    index, vectors = embed_terms(
+        {t for sections in section_terms_list for terms in sections.values() for t in terms}
+    )
+    pooled = np.zeros(
+        (len(section_terms_list), len(COARSE_SECTIONS), get_embedder().embedding_dimension),
+        dtype=np.float32,
+    )
+    for i, sections in enumerate(section_terms_list):
+        for j, section in enumerate(COARSE_SECTIONS):
+            rows = sorted({index[embedding_key(t)[1]] for t in sections[section]})
+            if rows:
+                pooled[i, j] = pooled_vector(vectors[rows])
+    return pooled
+
+
+class CoarseVectors:
+    """
+    Pooled section vectors of a job corpus, by job_id, saved as one .npz
+    (job_ids + vectors). Build it from the same job store file the app or a
+    shard serves, and rebuild it when the postings change: a job whose
+    content changed keeps its old vectors until then, which only affects
+    the coarse pass, never the full scores.
+    """
+
+    def __init__(self, job_ids, vectors):
+        self.job_ids = list(job_ids)
+        self.vectors = vectors  # (jobs, len(COARSE_SECTIONS), dim) float32
+        self.rows = {job_id: row for row, job_id in enumerate(self.job_ids)}
+
+    def __len__(self):
+        return len(self.job_ids)
+
+    @classmethod
+    def from_jobs(cls, job_list):
+        vectors = section_vectors([job_section_terms(job) for job in job_list])
+        return cls([job.get("job_id") for job in job_list], vectors)
+
+    def save(self, path):
+        np.savez(path, job_ids=np.array(self.job_ids), vectors=self.vectors)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data["job_ids"].tolist(), data["vectors"])
+
+    def for_jobs(self, job_list):
+        """
+        The section vectors of `job_list`, in job order. Jobs that are not in
+        the table are embedded and pooled on the spot.
+        """
+        rows = [self.rows.get(job.get("job_id")) for job in job_list]
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if not missing:
+            return self.vectors[rows]
+        print(f"[CoarseVectors] {len(missing)} of {len(job_list)} jobs have no stored vectors")
+        vectors = np.zeros((len(job_list),) + self.vectors.shape[1:], dtype=np.float32)
+        found = [i for i, row in enumerate(rows) if row is not None]
+        vectors[found] = self.vectors[[rows[i] for i in found]]
+        vectors[missing] = section_vectors([job_section_terms(job_list[i]) for i in missing])
+        return vectors
+
+
+def build_coarse_vectors(job_store_file, output_path):
+    """Builds and saves the CoarseVectors of every job in a job store file (see utils/job_store.py)."""
+    store = JobStore()
+    store.load_parquet(job_store_file)
+    coarse_vectors = CoarseVectors.from_jobs(store.all_jobs())
+    coarse_vectors.save(output_path)
+    print(f"[build_coarse_vectors] {output_path}: {len(coarse_vectors)} jobs")
+    return coarse_vectors
+
+
+########################################################################
+# COARSE SCORES
+########################################################################
+def coarse_scores(job_desc_json_lst, candidate_resume_JSON, coarse_vectors=None):
+    """
+    A cheap approximate match score per job, in job order: the mean cosine
+    between the job's and the resume's pooled section vectors (over the
+    sections both have), blended with the exact-string skill overlap.
+
+    With coarse_vectors (a CoarseVectors), the job side is read from it and a
+    request only embeds the resume's terms; the similarities for every job
+    are one product against the resume's section vectors. Without it, every
+    job's terms are embedded as well, which costs as much as the lookups the
+    full scorers make and leaves little to save.
+    """
+    if coarse_vectors is not None:
+        job_vectors = coarse_vectors.for_jobs(job_desc_json_lst)
+    else:
+        job_vectors = section_vectors([job_section_terms(job) for job in job_desc_json_lst])
+    resume_vectors = section_vectors([resume_section_terms(candidate_resume_JSON)])[0]
+
+    sims = np.einsum("nsd,sd->ns", job_vectors, resume_vectors)
+    both = np.any(job_vectors, axis=2) & np.any(resume_vectors, axis=1)
+    counts = both.sum(axis=1)
+    vector_scores = np.zeros(len(job_desc_json_lst))
+    np.divide(np.where(both, sims, 0).sum(axis=1), counts, out=vector_scores, where=counts > 0)
+
+    resume_skills = extract_resume_skill_terms(candidate_resume_JSON)
+    overlaps = np.array([skill_overlap(job, resume_skills) for job in job_desc_json_lst])
+    return COARSE_VECTOR_WEIGHT * vector_scores + COARSE_SKILL_WEIGHT * overlaps
+
+
+def select_coarse(scores, top_fraction=None, cutoff=None):
+    """
+    Positions of the jobs that go on to the full scorers, in job order: the
+    best `top_fraction` of them by coarse score (at least one), and/or those
+    scoring at least `cutoff`. With neither, every job.
+    """
+    keep = np.ones(len(scores), dtype=bool)
+    if cutoff is not None:
+        keep &= scores >= cutoff
+    if top_fraction is not None and len(scores):
+        n = max(1, math.ceil(top_fraction * len(scores)))
+        order = np.argsort(-scores, kind="stable")[:n]
+        top = np.zeros(len(scores), dtype=bool)
+        top[order] = True
+        keep &= top
+    return np.flatnonzero(keep)
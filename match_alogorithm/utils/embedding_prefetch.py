@@ -0,0 +1,81 @@
+# embedding_prefetch.py
+from match_alogorithm.utils.semantic_similarity import embedding_key, get_embeddings
+from match_alogorithm.init_pinecone import embedding_cache
+
+PREFETCH_BATCH = 32  # texts per blocking get_embeddings call
+
+
+########################################################################
+# TERM COLLECTION
+# Every string the scorers pass to get_embedding / nlp_similarity_cached.
+########################################################################
+def flatten_strings(value):
+    """Yields every string inside an arbitrarily nested list."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, list):
+        for item in value:
+            yield from flatten_strings(item)
+
+
+def collect_job_terms(job_json):
+    """Returns the set of job-side terms the nine scorers will embed."""
+    terms = {"Any"}  # education experience fallback
+    for level in ("mandatory", "preferred"):
+        section = job_json.get(level, {})
+        for req in section.get("hard_skills", []):
+            terms.update(flatten_strings(req.get("skill", [])))
+        for req in section.get("credentials", []):
+            terms.update(flatten_strings(req.get("credential", [])))
+        for req in section.get("education", []):
+            terms.update(flatten_strings(req.get("field_of_study", [])))
+        for req in section.get("professional_background", []):
+            terms.update(flatten_strings(req.get("background", [])))
+            terms.update(flatten_strings(req.get("industry", [])))
+    for resp in job_json.get("responsibility", {}).get("responsibilities", []):
+        terms.update(flatten_strings(resp.get("text", "")))
+    return terms
+
+
+def collect_resume_terms(resume_json):
+    """Returns the set of resume-side terms the nine scorers will embed."""
+    terms = set()
+    for item in resume_json.get("skills", []):
+        terms.update(flatten_strings(item.get("skill", [])))
+    for item in resume_json.get("responsibilities", []):
+        terms.update(flatten_strings(item.get("text", "")))
+    for item in resume_json.get("credentials", []):
+        terms.update(flatten_strings(item.get("credential", [])))
+    for edu in resume_json.get("education", []):
+        terms.update(flatten_strings(edu.get("major", [])))
+    for exp in resume_json.get("professional_background", []):
+        terms.update(flatten_strings(exp.get("field_of_study", [])))
+        terms.update(flatten_strings(exp.get("background", [])))
+        terms.update(flatten_strings(exp.get("industry", [])))
+    return terms
+
+
+def collect_terms(job_json_list, resume_json=None):
+    """Union of the job terms (and resume terms, if given)."""
+    terms = set()
+    for job_json in job_json_list:
+        terms |= collect_job_terms(job_json)
+    if resume_json is not None:
+        terms |= collect_resume_terms(resume_json)
+    return terms
+
+
+########################################################################
+# PREFETCH
+########################################################################
+def uncached_terms(terms):
+    """Drops the terms that are already in the embedding cache."""
+    return [t for t in terms if embedding_key(t)[1] not in embedding_cache]
+
+
+def prefetch_embeddings(terms):
+    """Fills the embedding cache for `terms` with batched lookups."""
+    missing = uncached_terms(terms)
+    for i in range(0, len(missing), PREFETCH_BATCH):
+        get_embeddings(missing[i:i + PREFETCH_BATCH])
+    return len(missing)
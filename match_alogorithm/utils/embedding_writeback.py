@@ -0,0 +1,140 @@
+# embedding_writeback.py
+import atexit
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from match_alogorithm.init_pinecone import get_pinecone_index
+
+WRITEBACK_BATCH = 100  # vectors per Pinecone upsert call
+WRITEBACK_MAX_PENDING = 10000  # queued vectors kept at most; further ones are dropped
+WRITEBACK_INTERVAL = 5  # seconds a partial batch waits before it is written
+WRITEBACK_FLUSH_TIMEOUT = 30  # seconds the exit flush may take
+WRITEBACK_TEXT_LIMIT = 1000  # characters of the text kept as metadata, as in vdb/string_embeddings.ipynb
+
+
+class EmbeddingWriteBack:
+    """
+    Write-behind queue for embeddings computed on SageMaker: they are upserted
+    to the string index (under their safe_id, with the text as metadata) by a
+    background thread, so other processes and later runs fetch them instead of
+    embedding the same string again, and the request path never waits on it.
+
+    Vectors are written in batches of WRITEBACK_BATCH, or every
+    WRITEBACK_INTERVAL seconds when fewer are queued. At most
+    WRITEBACK_MAX_PENDING wait at a time; past that new ones are dropped (and
+    counted), since a lost write-back only costs a later recomputation.
+    Whatever is still queued is written when the process exits.
+    """
+
+    def __init__(self, batch_size=WRITEBACK_BATCH, max_pending=WRITEBACK_MAX_PENDING,
+                 interval=WRITEBACK_INTERVAL, get_index=get_pinecone_index):
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.interval = interval
+        self.get_index = get_index
+        self.pending = OrderedDict()  # safe_id -> (text, vector)
+        self.condition = threading.Condition()
+        self.thread = None
+        self.closed = False
+        self.flushing = 0  # flush() calls waiting; partial batches are written at once
+        self.writing = 0  # vectors taken off the queue and not written yet
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def enqueue(self, safe_id, text, vector):
+        """Queues one (safe_id, vector) for the string index; never blocks on Pinecone."""
+        if not safe_id or not np.any(vector):
+            return  # zero vectors are the embedder's error fallback, not embeddings
+        with self.condition:
+            if self.closed:
+                return
+            if safe_id not in self.pending and len(self.pending) >= self.max_pending:
+                self.dropped += 1
+                return
+            self.pending[safe_id] = (text, vector)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="mirra-embedding-writeback", daemon=True)
+                self.thread.start()
+            if len(self.pending) >= self.batch_size:
+                self.condition.notify_all()
+
+    def take_batch(self):
+        # Called with the condition held
+        batch = []
+        while self.pending and len(batch) < self.batch_size:
+            batch.append(self.pending.popitem(last=False))
+        self.writing += len(batch)
+        return batch
+
+    def run(self):
+        while True:
+            with self.condition:
+                deadline = time.monotonic() + self.interval
+                while not (self.closed or self.flushing) and len(self.pending) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                if self.closed and not self.pending:
+                    return
+                batch = self.take_batch()
+            if batch:
+                self.write(batch)
+
+    def write(self, batch):
+        try:
+            index = self.get_index()
+            if index is None:
+                raise RuntimeError("string index unavailable")
+            index.upsert(vectors=[
+                {
+                    "id": safe_id,
+                    "values": [float(x) for x in vector],
+                    "metadata": {"text": text[:WRITEBACK_TEXT_LIMIT]},
+                }
+                for safe_id, (text, vector) in batch
+            ])
+            written, failed = len(batch), 0
+        except Exception as e:
+            print(f"[EmbeddingWriteBack] Upsert of {len(batch)} vectors failed:", str(e))
+            written, failed = 0, len(batch)
+        with self.condition:
+            self.writing -= len(batch)
+            self.written += written
+            self.failed += failed
+            self.condition.notify_all()
+
+    def flush(self, timeout=WRITEBACK_FLUSH_TIMEOUT):
+        """Waits until everything queued so far is written (or timeout); returns True if it was."""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            if self.thread is None:
+                return not self.pending
+            self.flushing += 1
+            self.condition.notify_all()
+            try:
+                while self.pending or self.writing:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self.condition.wait(remaining)
+                return True
+            finally:
+                self.flushing -= 1
+
+    def close(self, timeout=WRITEBACK_FLUSH_TIMEOUT):
+        """Writes what is queued and stops the thread; later enqueues are ignored."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+            thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+        if self.written or self.dropped or self.failed:
+            print(f"[EmbeddingWriteBack] written={self.written} dropped={self.dropped} failed={self.failed}")
+
+
+embedding_writeback = EmbeddingWriteBack()
+atexit.register(embedding_writeback.close)
@@ -1,8 +1,6 @@
 # Load Embedding Model for matching algorithm
 # Needed to cache the JSON extract from the candidate resume
 
-from sentence_transformers import SentenceTransformer
-import torch
 import streamlit as st
 
 @st.cache_resource
@@ -12,7 +10,12 @@ def load_sentence_model(
 ):
     """
     Load the SentenceTransformer model onto GPU if available, else CPU.
+    torch and sentence_transformers are imported here, so only this local
+    model backend loads them; the scorers use NumPy vectors.
     """
+    from sentence_transformers import SentenceTransformer
+    import torch
+
     device_str = "cuda" if torch.cuda.is_available() else "cpu"
     model = SentenceTransformer(
         model_name,
@@ -1,5 +1,5 @@
 import numpy as np
-from match_alogorithm.utils.semantic_similarity import get_embedding
+from match_alogorithm.utils.semantic_similarity import get_embedding, active_similarity_matrix
 import faiss
 
 ########################################################################
@@ -34,7 +34,7 @@ def build_faiss_index(terms):
     """
     embeddings = []
     for term in terms:
-        emb = get_embedding(term).detach().cpu().numpy().astype(np.float32)
+        emb = get_embedding(term)
         norm = np.linalg.norm(emb)
         if norm > 0:
             emb = emb / norm
@@ -54,11 +54,18 @@ def compute_group_similarity(candidate_group, required_group):
     if not candidate_group or not required_group:
         return 0.0
 
+    # Precomputed similarities (batch matching) when available.
+    matrix = active_similarity_matrix.get()
+    if matrix is not None:
+        sim = matrix.group_similarity(candidate_group, required_group)
+        if sim is not None:
+            return sim
+
     # Build FAISS index for candidate_group texts.
     index, _ = build_faiss_index(candidate_group)
     sims = []
     for req_term in required_group:
-        req_emb = get_embedding(req_term).detach().cpu().numpy().astype(np.float32)
+        req_emb = get_embedding(req_term)
         norm = np.linalg.norm(req_emb)
         if norm > 0:
             req_emb = req_emb / norm
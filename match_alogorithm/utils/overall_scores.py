@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def make_overall_scores(
     job_scores_dict,
     # top-level weights (must sum to 1):
@@ -171,3 +174,139 @@ def make_overall_scores(
     )
 
     return sorted_list
+
+
+###############################################################################
+# Vectorized overall scores and re-weighting
+###############################################################################
+MANDATORY_FIELDS = {
+    "skill": "mandatory_skill_score",
+    "education": "mandatory_education_score",
+    "background": "mandatory_background_score",
+    "credentials": "mandatory_credentials_score",
+    "responsibilities": "responsibilities_score",
+}
+PREFERRED_FIELDS = {
+    "skill": "preferred_skill_score",
+    "education": "preferred_education_score",
+    "background": "preferred_background_score",
+    "credentials": "preferred_credentials_score",
+}
+CATEGORY_FIELDS = {
+    "overall_skills": ("mandatory_skill_score", "preferred_skill_score"),
+    "overall_education": ("mandatory_education_score", "preferred_education_score"),
+    "overall_background": ("mandatory_background_score", "preferred_background_score"),
+    "overall_credentials": ("mandatory_credentials_score", "preferred_credentials_score"),
+}
+SUB_SCORE_FIELDS = list(MANDATORY_FIELDS.values()) + list(PREFERRED_FIELDS.values())
+OVERALL_FIELDS = [
+    "overall_mandatory",
+    "overall_preferred",
+    "overall_score",
+    "overall_skills",
+    "overall_education",
+    "overall_background",
+    "overall_credentials",
+]
+
+
+def make_overall_columns(
+    columns,
+    mandatory_weight=0.8,
+    preferred_weight=0.2,
+    skills_weight=0.24,
+    education_weight=0.24,
+    background_weight=0.24,
+    credentials_weight=0.24,
+    responsibilities_weight=0.04,
+):
+    """
+    Array version of make_overall_scores. `columns` maps each sub-score field
+    to a float array with NaN where the score is None (missing fields count as
+    all-NaN). Returns {overall_field: array}, NaN where the result is None.
+    Same weights, checks and None-skipping rules as make_overall_scores.
+    """
+    eps = 1e-9
+    if abs((mandatory_weight + preferred_weight) - 1.0) > eps:
+        raise ValueError("Error: mandatory_weight + preferred_weight must equal 1.")
+    subcat_sum = (
+        skills_weight
+        + education_weight
+        + background_weight
+        + credentials_weight
+        + responsibilities_weight
+    )
+    if abs(subcat_sum - 1.0) > eps:
+        raise ValueError("Error: subcategory weights must sum to 1.")
+
+    n = len(next(iter(columns.values()))) if columns else 0
+    empty = np.full(n, np.nan)
+
+    def weighted_avg(pairs):
+        numerator = np.zeros(n)
+        denom = np.zeros(n)
+        for vals, w in pairs:
+            present = ~np.isnan(vals)
+            numerator += np.where(present, vals, 0.0) * w
+            denom += np.where(present, w, 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(denom == 0.0, np.nan, numerator / denom)
+
+    weights = {
+        "skill": skills_weight,
+        "education": education_weight,
+        "background": background_weight,
+        "credentials": credentials_weight,
+        "responsibilities": responsibilities_weight,
+    }
+    overall_mandatory = weighted_avg(
+        (columns.get(field, empty), weights[cat]) for cat, field in MANDATORY_FIELDS.items()
+    )
+    overall_preferred = weighted_avg(
+        (columns.get(field, empty), weights[cat]) for cat, field in PREFERRED_FIELDS.items()
+    )
+    result = {
+        "overall_mandatory": overall_mandatory,
+        "overall_preferred": overall_preferred,
+        "overall_score": weighted_avg(
+            [(overall_mandatory, mandatory_weight), (overall_preferred, preferred_weight)]
+        ),
+    }
+    for overall_field, fields in CATEGORY_FIELDS.items():
+        # Plain average ignoring None, like safe_avg.
+        result[overall_field] = weighted_avg((columns.get(f, empty), 1.0) for f in fields)
+    return result
+
+
+def reweight(match_results, **weights):
+    """
+    Recomputes the overall_* fields of existing results with new weights and
+    returns them re-sorted by overall_score (None last), without re-running any
+    scorer. Accepts the weight keywords of make_overall_scores.
+
+    `match_results` is the list returned by calculate_match_score (job dicts
+    with "match_scores") or a list of (job_id, match_scores) pairs. The
+    match_scores dicts are updated in place.
+    """
+    if not match_results:
+        return []
+    first = match_results[0]
+    if isinstance(first, dict):
+        score_dicts = [item["match_scores"] for item in match_results]
+    else:
+        score_dicts = [item[1] for item in match_results]
+
+    columns = {
+        field: np.array([d.get(field) for d in score_dicts], dtype=float)  # None -> NaN
+        for field in SUB_SCORE_FIELDS
+    }
+    overall = make_overall_columns(columns, **weights)
+
+    for field in OVERALL_FIELDS:
+        values = overall[field].astype(object)
+        values[np.isnan(overall[field])] = None
+        for d, value in zip(score_dicts, values.tolist()):
+            d[field] = value
+
+    order = np.argsort(-overall["overall_score"], kind="stable")  # NaN sorts last
+    return [match_results[i] for i in order]
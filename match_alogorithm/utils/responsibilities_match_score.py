@@ -1,6 +1,6 @@
 # responsibilities_match_score.py
 import numpy as np
-from match_alogorithm.utils.semantic_similarity import get_embedding
+from match_alogorithm.utils.semantic_similarity import get_embedding, active_similarity_matrix
 import faiss
 
 ###############################################
@@ -27,7 +27,7 @@ def build_faiss_index_for_terms(terms):
     """
     embeddings = []
     for term in terms:
-        emb = get_embedding(term).detach().cpu().numpy().astype(np.float32)
+        emb = get_embedding(term)
         norm_val = np.linalg.norm(emb)
         if norm_val > 0:
             emb = emb / norm_val
@@ -47,10 +47,17 @@ def faiss_group_similarity(candidate_texts, required_texts):
     if not candidate_texts or not required_texts:
         return 0.0
 
+    # Precomputed similarities (batch matching) when available.
+    matrix = active_similarity_matrix.get()
+    if matrix is not None:
+        sim = matrix.group_similarity(candidate_texts, required_texts)
+        if sim is not None:
+            return sim
+
     index = build_faiss_index_for_terms(candidate_texts)
     sims = []
     for req_text in required_texts:
-        req_emb = get_embedding(req_text).detach().cpu().numpy().astype(np.float32)
+        req_emb = get_embedding(req_text)
         norm_val = np.linalg.norm(req_emb)
         if norm_val > 0:
             req_emb = req_emb / norm_val
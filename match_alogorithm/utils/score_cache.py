@@ -0,0 +1,220 @@
+# score_cache.py
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+from match_alogorithm.utils import semantic_similarity
+
+MISSING = object()  # cache miss (a scorer's stored value may itself be falsy)
+NUMPY_TAG = "__numpy__"  # marks a stored NumPy scalar: {NUMPY_TAG: dtype, "value": value}
+VALUE_FORMAT = "2"  # part of every scorer version; bump when the stored value encoding changes
+
+
+def resume_fingerprint(resume_json):
+    """Stable hash of a resume's content, used to key its cached scores."""
+    payload = json.dumps(resume_json, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def job_fingerprint(job_json):
+    """Stable hash of a job's content (ignoring the match_scores we attach)."""
+    content = {k: v for k, v in job_json.items() if k != "match_scores"}
+    payload = json.dumps(content, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def scorer_version(scorer):
+    """
+    Hash of the source of the scorer's module (thresholds and helpers live
+    there) and of the shared similarity code. Editing a scorer module changes
+    only that scorer's version.
+    """
+    digest = hashlib.sha256(inspect.getsource(inspect.getmodule(scorer)).encode("utf-8"))
+    digest.update(inspect.getsource(semantic_similarity).encode("utf-8"))
+    digest.update(VALUE_FORMAT.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def encode_numpy(obj):
+    """
+    json.dumps default for NumPy scalars: keeps the dtype so decode_value
+    restores the same type. The stage filter (merge_scores_by_job_id) only
+    thresholds int/float values, so a np.float32 score read back as a float
+    would filter differently from the freshly computed one.
+    """
+    if isinstance(obj, np.generic):
+        return {NUMPY_TAG: obj.dtype.str, "value": obj.item()}
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Cannot store {type(obj).__name__} in the score store")
+
+
+def decode_numpy(obj):
+    if NUMPY_TAG in obj:
+        return np.dtype(obj[NUMPY_TAG]).type(obj["value"])
+    return obj
+
+
+def encode_value(value):
+    return json.dumps(value, default=encode_numpy)
+
+
+def decode_value(text):
+    return json.loads(text, object_hook=decode_numpy)
+
+
+###############################################################################
+# Persistent store
+###############################################################################
+SCORE_STORE_PATH = "./data/score_store.sqlite"
+LOADED_RESUMES = 64  # resumes whose rows are kept in memory
+FLUSH_EVERY = 500  # buffered writes before an automatic commit
+
+
+class SQLiteScoreStore:
+    """
+    File-backed store of per-scorer results, keyed by (resume fingerprint,
+    job_id, job content hash, scorer version), so repeat searches skip scoring
+    across process restarts.
+
+    A row is only used if the job content and the scorer version still match.
+    On open, rows written by an older version of a scorer are deleted; rows of
+    the other scorers are kept. Reads for a resume are served from memory
+    after its rows are loaded once; writes are buffered and committed in
+    batches (and on flush()).
+    """
+
+    def __init__(self, path=SCORE_STORE_PATH, scorer_versions=None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS scores (
+                resume_fp TEXT NOT NULL,
+                job_id TEXT NOT NULL,
+                job_hash TEXT NOT NULL,
+                scorer TEXT NOT NULL,
+                scorer_version TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (resume_fp, job_id, scorer)
+            )
+            """
+        )
+        self._conn.commit()
+        self._loaded = OrderedDict()  # resume_fp -> {(job_id, scorer): (job_hash, version, value)}
+        self._pending = []
+        if scorer_versions:
+            self.invalidate_stale(scorer_versions)
+
+    def invalidate_stale(self, scorer_versions):
+        """Deletes rows whose scorer version differs from the current one."""
+        with self._lock:
+            for scorer_name, version in scorer_versions.items():
+                deleted = self._conn.execute(
+                    "DELETE FROM scores WHERE scorer = ? AND scorer_version != ?",
+                    (scorer_name, version),
+                ).rowcount
+                if deleted:
+                    print(f"[SQLiteScoreStore] Dropped {deleted} stale '{scorer_name}' scores")
+            self._conn.commit()
+            self._loaded.clear()
+
+    def _rows_for(self, resume_fp):
+        # Caller holds the lock.
+        rows = self._loaded.get(resume_fp)
+        if rows is None:
+            rows = {
+                (job_id, scorer_name): (job_hash, version, value)
+                for job_id, job_hash, scorer_name, version, value in self._conn.execute(
+                    "SELECT job_id, job_hash, scorer, scorer_version, value"
+                    " FROM scores WHERE resume_fp = ?",
+                    (resume_fp,),
+                )
+            }
+            self._loaded[resume_fp] = rows
+            if len(self._loaded) > LOADED_RESUMES:
+                self._loaded.popitem(last=False)
+        else:
+            self._loaded.move_to_end(resume_fp)
+        return rows
+
+    def get(self, scorer_name, resume_fp, job_id, job_hash, version):
+        with self._lock:
+            row = self._rows_for(resume_fp).get((str(job_id), scorer_name))
+        if row is None or row[0] != job_hash or row[1] != version:
+            return MISSING
+        return decode_value(row[2])
+
+    def put(self, scorer_name, resume_fp, job_id, job_hash, version, value):
+        value = encode_value(value)
+        with self._lock:
+            self._rows_for(resume_fp)[(str(job_id), scorer_name)] = (job_hash, version, value)
+            self._pending.append((resume_fp, str(job_id), job_hash, scorer_name, version, value))
+            if len(self._pending) >= FLUSH_EVERY:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if self._pending:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO scores"
+                " (resume_fp, job_id, job_hash, scorer, scorer_version, value)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                self._pending,
+            )
+            self._conn.commit()
+            self._pending = []
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def bind(self, resume_json, scorer_versions=None):
+        return BoundScoreStore(self, resume_fingerprint(resume_json), scorer_versions or {})
+
+
+class BoundScoreStore:
+    """SQLiteScoreStore view for one resume; job hashes are computed once per job."""
+
+    def __init__(self, store, resume_fp, scorer_versions):
+        self.store = store
+        self.resume_fp = resume_fp
+        self.scorer_versions = scorer_versions
+        self._job_hashes = {}
+
+    def _job_hash(self, job):
+        job_id = job.get("job_id")
+        if job_id not in self._job_hashes:
+            self._job_hashes[job_id] = job_fingerprint(job)
+        return self._job_hashes[job_id]
+
+    def get(self, scorer_name, job):
+        return self.store.get(
+            scorer_name,
+            self.resume_fp,
+            job.get("job_id"),
+            self._job_hash(job),
+            self.scorer_versions.get(scorer_name, ""),
+        )
+
+    def put(self, scorer_name, job, value):
+        self.store.put(
+            scorer_name,
+            self.resume_fp,
+            job.get("job_id"),
+            self._job_hash(job),
+            self.scorer_versions.get(scorer_name, ""),
+            value,
+        )
+
+    def flush(self):
+        self.store.flush()
@@ -0,0 +1,136 @@
+# score_table.py
+import numpy as np
+from match_alogorithm.utils.overall_scores import make_overall_columns
+
+
+class ScoreTable:
+    """
+    Scores of many jobs stored by column: one row per job_id and one float
+    array per score field, with NaN standing in for None.
+
+    A mask per field records which jobs actually had the field, so converting
+    back gives the same dicts merge_scores_by_job_id and make_overall_scores
+    build. Overall scores and ranking (Stage 3) are array operations; dicts
+    are only rebuilt at the edge (to_dict / records). The stage thresholds
+    stay in merge_scores_by_job_id.
+    """
+
+    def __init__(self, job_ids, columns, present=None):
+        self.job_ids = list(job_ids)
+        self.columns = columns  # field -> float array, NaN for None
+        if present is None:
+            present = {field: np.ones(len(self.job_ids), dtype=bool) for field in columns}
+        self.present = present  # field -> bool array, False where the job lacks the field
+
+    def __len__(self):
+        return len(self.job_ids)
+
+    ###########################################################################
+    # Building
+    ###########################################################################
+    @classmethod
+    def from_records(cls, records):
+        """
+        Builds a table from (job_id, score_dict) pairs, one row per pair.
+        Score values must be numbers or None; a score_dict that is not a dict
+        gives a row without fields.
+        """
+        job_ids = []
+        rows = []
+        for job_id, scores in records:
+            job_ids.append(job_id)
+            rows.append(scores if isinstance(scores, dict) else {})
+        fields = list(dict.fromkeys(field for row in rows for field in row))
+        columns = {}
+        present = {}
+        for field in fields:
+            columns[field] = np.array([row.get(field) for row in rows], dtype=float)
+            present[field] = np.array([field in row for row in rows], dtype=bool)
+        return cls(job_ids, columns, present)
+
+    ###########################################################################
+    # Array operations
+    ###########################################################################
+    def take(self, rows):
+        """A new table with only the given row positions, in that order."""
+        rows = np.asarray(rows, dtype=np.intp)
+        return ScoreTable(
+            [self.job_ids[i] for i in rows],
+            {field: col[rows] for field, col in self.columns.items()},
+            {field: mask[rows] for field, mask in self.present.items()},
+        )
+
+    def with_overall_scores(self, **weights):
+        """
+        A new table with the overall_* columns computed by make_overall_columns
+        (same weights and None rules as make_overall_scores).
+        """
+        columns = dict(self.columns)
+        present = dict(self.present)
+        for field, col in make_overall_columns(self.columns, **weights).items():
+            columns[field] = col
+            present[field] = np.ones(len(self), dtype=bool)
+        return ScoreTable(self.job_ids, columns, present)
+
+    def ranking(self, field="overall_score", tiebreak=None):
+        """
+        Row positions sorted by `field` descending, skipping rows where it is
+        None. Ties are broken by `tiebreak` (an array, ascending) or by row order.
+        """
+        col = self.columns[field]
+        if tiebreak is None:
+            tiebreak = np.arange(len(self))
+        order = np.lexsort((tiebreak, -col))
+        return order[~np.isnan(col[order])]
+
+    ###########################################################################
+    # Back to dicts
+    ###########################################################################
+    def records(self, rows=None):
+        """
+        [(job_id, score_dict)] for the given row positions (all rows by default),
+        with native floats and None, and only the fields each job had.
+        """
+        if rows is None:
+            rows = np.arange(len(self))
+        rows = np.asarray(rows, dtype=np.intp)
+        fields = list(self.columns)
+        values = []
+        present = []
+        complete = np.ones(len(rows), dtype=bool)
+        for field in fields:
+            col = self.columns[field][rows]
+            col_values = col.astype(object)
+            col_values[np.isnan(col)] = None
+            values.append(col_values.tolist())
+            mask = self.present[field][rows]
+            present.append(mask.tolist())
+            complete &= mask
+
+        records = []
+        job_ids = [self.job_ids[row] for row in rows.tolist()]
+        for job_id, row_values, row_present, full in zip(
+            job_ids, zip(*values), zip(*present), complete.tolist()
+        ):
+            if full:
+                scores = dict(zip(fields, row_values))
+            else:
+                scores = {
+                    field: value
+                    for field, value, has_field in zip(fields, row_values, row_present)
+                    if has_field
+                }
+            records.append((job_id, scores))
+        return records
+
+    def to_dict(self):
+        """{job_id: score_dict}, the shape merge_scores_by_job_id returns."""
+        return dict(self.records())
+
+
+def has_any_score(score_dict):
+    """
+    True if any score in the dict is not None, i.e. make_overall_scores (with
+    positive weights) would give the job an overall score.
+    """
+    return any(value is not None for value in score_dict.values())
@@ -1,22 +1,31 @@
 import traceback
-import torch
-from sentence_transformers import util
+import numpy as np
+from contextvars import ContextVar
 from concurrent.futures import ThreadPoolExecutor, TimeoutError
 import unicodedata
-from match_alogorithm.init_pinecone import pinecone_index, embedding_cache
+from match_alogorithm.init_pinecone import get_pinecone_index, embedding_cache
+from match_alogorithm.utils.embedding_writeback import embedding_writeback
 
-from utils.embeddings import EmbeddingGenerator
+from utils.clients import embedding_generator
 
-embedder = EmbeddingGenerator(
-    endpoint_name="e5-embeddings-huggingface",
-    region="us-east-1",           # e.g. "us-east-1"
-    embedding_dimension=1024            # match your model dimension
-)
-
-# GPU If Avail
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+EMBEDDING_ENDPOINT = "e5-embeddings-huggingface"
+EMBEDDING_REGION = "us-east-1"
+EMBEDDING_DIMENSION = 1024  # match your model dimension
 
 PINECONE_FETCH_TIMEOUT = 30  # seconds
+PINECONE_FETCH_BATCH = 100  # ids per Pinecone fetch call
+PINECONE_FETCH_WORKERS = 8
+
+# Precomputed term x term similarities (see similarity_matrix.py). While one is
+# active, similarity lookups are read from it instead of comparing embeddings.
+active_similarity_matrix = ContextVar("active_similarity_matrix", default=None)
+
+# One shared pool for Pinecone fetches instead of a new thread per lookup.
+pinecone_fetch_executor = ThreadPoolExecutor(max_workers=PINECONE_FETCH_WORKERS)
+
+def get_embedder():
+    """The SageMaker embedder, created on first use and shared by the process (see utils/clients.py)."""
+    return embedding_generator(EMBEDDING_ENDPOINT, EMBEDDING_REGION, EMBEDDING_DIMENSION)
 
 def ascii_only(text: str) -> str:
     """
@@ -24,56 +33,88 @@ def ascii_only(text: str) -> str:
     """
     return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
 
+def embedding_key(text):
+    """
+    Returns (text, safe_id): the stripped text that gets embedded and the
+    ASCII-only id it is cached and stored under.
+    """
+    if isinstance(text, list):
+        text = " ".join(text)
+    text = text.strip()
+    return text, ascii_only(text)
+
+def fetch_pinecone_vectors(safe_ids):
+    """
+    Fetches stored vectors for `safe_ids` from Pinecone in batches.
+    Returns {safe_id: values} for the ids that were found.
+    """
+    found = {}
+    pinecone_index = get_pinecone_index()
+    if pinecone_index is None:
+        return found
+    for i in range(0, len(safe_ids), PINECONE_FETCH_BATCH):
+        batch = safe_ids[i:i + PINECONE_FETCH_BATCH]
+        future = pinecone_fetch_executor.submit(pinecone_index.fetch, ids=batch)
+        try:
+            fetch_result = future.result(timeout=PINECONE_FETCH_TIMEOUT)
+        except TimeoutError:
+            continue
+        except Exception as e:
+            print(f"Error while fetching from Pinecone: {e}")
+            continue
+        if fetch_result and fetch_result.vectors:
+            for safe_id, vector in fetch_result.vectors.items():
+                found[safe_id] = vector.values
+    return found
+
+def get_embeddings(texts):
+    """
+    Batch version of get_embedding: returns one embedding per text, looking in
+    the local cache first, then fetching all the misses from Pinecone in one go,
+    and only sending what is still missing to the SageMaker endpoint. New
+    embeddings are queued for writing back to Pinecone (embedding_writeback.py).
+    """
+    keys = [embedding_key(text) for text in texts]
+
+    missing = {}
+    for text, safe_id in keys:
+        if safe_id not in embedding_cache and safe_id not in missing:
+            missing[safe_id] = text
+
+    if missing:
+        fetched = fetch_pinecone_vectors(list(missing))
+        for safe_id, values in fetched.items():
+            embedding_cache[safe_id] = np.asarray(values, dtype=np.float32)
+            missing.pop(safe_id, None)
+
+    if missing:
+        emb_list = get_embedder().generate_embeddings(list(missing.values()))  # one row per text
+        for i, safe_id in enumerate(missing):
+            if emb_list is not None and i < len(emb_list):
+                emb = np.asarray(emb_list[i], dtype=np.float32)
+            else:
+                emb = np.zeros(get_embedder().embedding_dimension, dtype=np.float32)
+            embedding_cache[safe_id] = emb
+            embedding_writeback.enqueue(safe_id, missing[safe_id], emb)
+
+    return [embedding_cache[safe_id] for _, safe_id in keys]
+
 def get_embedding(text: str):
     """
     Return the embedding of 'text' from:
       1) local cache (if available),
       2) Pinecone (if fetchable by ID),
-      3) Otherwise, call your SageMaker endpoint via embedder.generate_embeddings.
+      3) Otherwise, call your SageMaker endpoint via get_embedder().generate_embeddings.
       
     This version sanitizes the vector ID so that only ASCII characters are used.
     """
-    if isinstance(text, list):
-        text = " ".join(text)
-        
-    text = text.strip()
-    # Sanitize the text into an ASCII-only string to use as the vector ID.
-    safe_id = ascii_only(text)
+    text, safe_id = embedding_key(text)
 
     # Check local cache first using safe_id.
     if safe_id in embedding_cache:
         return embedding_cache[safe_id]
 
-    fetch_result = None
-    # Attempt to fetch from Pinecone with a timeout, using safe_id.
-    if pinecone_index is not None:
-        def fetch_pinecone_vector():
-            return pinecone_index.fetch(ids=[safe_id])
-        
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(fetch_pinecone_vector)
-            try:
-                fetch_result = future.result(timeout=PINECONE_FETCH_TIMEOUT)
-            except TimeoutError:
-                fetch_result = None
-            except Exception as e:
-                print(f"Error while fetching from Pinecone: {e}")
-                fetch_result = None
-
-    if not fetch_result or not fetch_result.vectors:
-        emb_list = embedder.generate_embeddings([text])  # returns list of lists
-        if emb_list and len(emb_list) > 0:
-            emb_tensor = torch.tensor(emb_list[0], device=device, dtype=torch.float32)
-        else:
-            emb_tensor = torch.zeros(embedder.embedding_dimension, device=device, dtype=torch.float32)
-        
-        embedding_cache[safe_id] = emb_tensor
-        return emb_tensor
-    else:
-        fetched_vector = fetch_result.vectors[safe_id].values
-        emb_tensor = torch.tensor(fetched_vector, device=device, dtype=torch.float32)
-        embedding_cache[safe_id] = emb_tensor
-        return emb_tensor
+    return get_embeddings([text])[0]
 
 # No Pinecone Leverage
 # def get_embedding(text: str):
@@ -101,12 +142,31 @@ def get_embedding(text: str):
 #     return emb_tensor
 
 def cosine_similarity(vec1, vec2):
-    return util.cos_sim(vec1, vec2)
+    """
+    Cosine similarity of two vectors, as sentence_transformers' util.cos_sim
+    computes it (each side divided by max(norm, 1e-12)), in NumPy.
+    """
+    vec1 = np.asarray(vec1, dtype=np.float32)
+    vec2 = np.asarray(vec2, dtype=np.float32)
+    norms = max(float(np.linalg.norm(vec1)), 1e-12) * max(float(np.linalg.norm(vec2)), 1e-12)
+    return float(np.dot(vec1, vec2)) / norms
+
+def add_embeddings(safe_ids, vectors):
+    """Puts precomputed embeddings (e.g. a shard's embedding pack) into the local cache."""
+    for safe_id, vector in zip(safe_ids, vectors):
+        embedding_cache[safe_id] = np.asarray(vector, dtype=np.float32)
+
+def embedding_to_numpy(emb):
+    """Returns an embedding (a cached vector or a list) as a float32 NumPy vector."""
+    return np.asarray(emb, dtype=np.float32)
 
 def compute_semantic_similarity(text1: str, text2: str) -> float:
-    emb1 = get_embedding(text1)
-    emb2 = get_embedding(text2)
-    raw_similarity = float(util.cos_sim(emb1, emb2))
+    matrix = active_similarity_matrix.get()
+    raw_similarity = matrix.cosine(text1, text2) if matrix is not None else None
+    if raw_similarity is None:
+        emb1 = get_embedding(text1)
+        emb2 = get_embedding(text2)
+        raw_similarity = cosine_similarity(emb1, emb2)
 
     # The same normalization you had before (optional)
     normalized = (raw_similarity - 0.7) / 0.3
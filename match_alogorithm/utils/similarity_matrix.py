@@ -0,0 +1,109 @@
+# similarity_matrix.py
+from contextlib import contextmanager
+import numpy as np
+from match_alogorithm.utils.semantic_similarity import (
+    active_similarity_matrix,
+    embedding_key,
+    embedding_to_numpy,
+    get_embedder,
+    get_embeddings,
+)
+
+
+########################################################################
+# TERM EMBEDDING
+########################################################################
+def embed_terms(terms):
+    """
+    Embeds `terms` and returns (index, vectors): {safe_id: row} and a float32
+    matrix of unit-normalized rows (zero vectors are left as zeros, like the
+    FAISS helpers in the scorers).
+    """
+    index = {}
+    texts = []
+    for term in terms:
+        _, safe_id = embedding_key(term)
+        if safe_id not in index:
+            index[safe_id] = len(texts)
+            texts.append(term)
+    if not texts:
+        return index, np.zeros((0, get_embedder().embedding_dimension), dtype=np.float32)
+
+    vectors = np.vstack([embedding_to_numpy(emb) for emb in get_embeddings(texts)])
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return index, vectors
+
+
+def pooled_vector(vectors):
+    """Unit-normalized mean of a set of unit vectors (zeros if there are none)."""
+    if len(vectors) == 0:
+        return np.zeros(get_embedder().embedding_dimension, dtype=np.float32)
+    pooled = vectors.mean(axis=0)
+    norm = np.linalg.norm(pooled)
+    return pooled / norm if norm > 0 else pooled
+
+
+########################################################################
+# SIMILARITY MATRIX
+########################################################################
+class TermSimilarityMatrix:
+    """
+    Cosine similarities between every row term (resume side) and every column
+    term (job side), computed with one matrix product.
+
+    Lookups return None for terms that are not in the matrix, so callers can
+    fall back to comparing embeddings directly.
+    """
+
+    def __init__(self, row_index, col_index, sims):
+        self.row_index = row_index
+        self.col_index = col_index
+        self.sims = sims
+
+    @classmethod
+    def from_vectors(cls, row_index, row_vectors, col_index, col_vectors):
+        return cls(row_index, col_index, row_vectors @ col_vectors.T)
+
+    @classmethod
+    def from_terms(cls, row_terms, col_terms):
+        row_index, row_vectors = embed_terms(row_terms)
+        col_index, col_vectors = embed_terms(col_terms)
+        return cls.from_vectors(row_index, row_vectors, col_index, col_vectors)
+
+    def cosine(self, text1, text2):
+        """Raw cosine similarity of two terms, in either orientation."""
+        key1 = embedding_key(text1)[1]
+        key2 = embedding_key(text2)[1]
+        row, col = self.row_index.get(key1), self.col_index.get(key2)
+        if row is None or col is None:
+            row, col = self.row_index.get(key2), self.col_index.get(key1)
+            if row is None or col is None:
+                return None
+        return float(self.sims[row, col])
+
+    def group_similarity(self, candidate_terms, required_terms):
+        """
+        For each required term, the best similarity over the candidate terms,
+        averaged; the same value the FAISS group helpers compute.
+
+        The result is a np.float32 summed one term at a time, as the FAISS
+        helpers do: the stage filter (merge_scores_by_job_id) treats float32
+        and float scores differently, so the type has to match too.
+        """
+        rows = [self.row_index.get(embedding_key(t)[1]) for t in candidate_terms]
+        cols = [self.col_index.get(embedding_key(t)[1]) for t in required_terms]
+        if not rows or not cols or None in rows or None in cols:
+            return None
+        best = self.sims[np.ix_(rows, cols)].max(axis=0)
+        return sum(best) / len(best)
+
+
+@contextmanager
+def use_similarity_matrix(matrix):
+    """Makes `matrix` the active similarity source for the current context."""
+    token = active_similarity_matrix.set(matrix)
+    try:
+        yield matrix
+    finally:
+        active_similarity_matrix.reset(token)
@@ -3,6 +3,9 @@ import streamlit.components.v1 as components
 import json
 import pandas as pd
 import utils.common as com
+from utils.job_store import get_job_store
+
+PAGE_SIZE = 50  # jobs whose details are loaded and sent to the page at a time
 
 def join_array(array, column='', delim=','):
     return delim.join(item[column] for item in array)
@@ -16,8 +19,23 @@ def main():
     matches = json.loads('[]')
     # if 'matches' in st.session_state:
     #     matches = st.session_state['matches']
-    matches = json.dumps(com.read_json_result('match_result.json'))
-    com.logger(matches)
+    match_records = st.session_state.get('matches')
+    if isinstance(match_records, list):
+        # Compact (job_id, match_scores) records: only the current page gets job details
+        total = len(match_records)
+        pages = max(1, -(-total // PAGE_SIZE))
+        page = min(st.session_state.get('match_page', 1), pages)
+        st.session_state['match_page'] = page
+        page_records = match_records[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        job_store = st.session_state.get('match_store')
+        if job_store is None:
+            job_store = get_job_store()
+        matches = json.dumps(job_store.with_details(page_records))
+    else:
+        total = None
+        pages = 1
+        matches = json.dumps(com.read_json_result('match_result.json'))
+    com.logger(f"{total} matches, page size {PAGE_SIZE}")
 
     header = st.container(key='match-header')
     body = st.container(key='match-body')
@@ -35,6 +53,8 @@ def main():
         total_pane.markdown("<div id='result_count'><span id='num_of_result'>0</span> Jobs are found.</div>", unsafe_allow_html=True)
         if(retry_pane.button("Re-Run and Adjust Filters")):
             st.switch_page("app.py")
+        if pages > 1:
+            left_result.number_input("Page", min_value=1, max_value=pages, key="match_page")
         left.container(key="left-pane", height=563, border=True, )
 
     with middle:
@@ -43,7 +63,7 @@ def main():
             js_call = f"""
                 window.onload = () => {{
                     const jsonData = {matches};
-                    handleData(jsonData);
+                    handleData(jsonData, {json.dumps(total)});
                 }};
                 """
             
@@ -0,0 +1,113 @@
+# clients.py
+import os
+import threading
+
+# External clients (Pinecone, SageMaker, S3, OpenAI, the embedder) shared by the whole
+# process. Each one is created the first time it is asked for, so importing
+# a module that uses them costs no network I/O, and every later request
+# reuses the same client instead of reconnecting.
+_clients = {}
+_locks = {}
+_lock = threading.Lock()
+
+# boto3 clients: one connection pool per service for the whole process. It
+# must cover every thread that may call AWS at once: the shared Stage 1 and
+# Stage 2 scoring pools (calculate_match_score.STAGE1_WORKERS/STAGE2_WORKERS),
+# the search threads and the embedding prefetch; botocore's default of 10
+# would make them queue.
+AWS_MAX_POOL_CONNECTIONS = 64
+AWS_MAX_ATTEMPTS = 5  # adaptive retry mode also rate-limits the client when throttled
+AWS_CONNECT_TIMEOUT = 5  # seconds
+AWS_READ_TIMEOUT = 60  # seconds
+
+
+def get_client(key, factory):
+    """
+    The client stored under `key`, created with factory() on first use. The
+    factory runs once per key even when several threads ask at the same
+    time; its result (None included) is kept until reset_client.
+    """
+    if key in _clients:
+        return _clients[key]
+    with _lock:
+        key_lock = _locks.setdefault(key, threading.Lock())
+    with key_lock:
+        if key not in _clients:
+            _clients[key] = factory()
+    return _clients[key]
+
+
+def reset_client(key=None):
+    """Drops the client stored under `key` (every client if None), so the next use recreates it."""
+    with _lock:
+        if key is None:
+            _clients.clear()
+        else:
+            _clients.pop(key, None)
+
+
+###############################################################################
+# Factories
+###############################################################################
+def aws_credentials():
+    import streamlit as st
+    return {
+        "aws_access_key_id": os.getenv("AWS_ACCESS_KEY_ID", st.secrets["aws"]["access_key_id"]),
+        "aws_secret_access_key": os.getenv("AWS_SECRET_ACCESS_KEY", st.secrets["aws"]["secret_access_key"]),
+    }
+
+
+def aws_config():
+    from botocore.config import Config
+    return Config(
+        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+        retries={"max_attempts": AWS_MAX_ATTEMPTS, "mode": "adaptive"},
+        tcp_keepalive=True,
+        connect_timeout=AWS_CONNECT_TIMEOUT,
+        read_timeout=AWS_READ_TIMEOUT,
+    )
+
+
+def aws_client(service):
+    """The process-wide boto3 client for `service`, with the pooled config above."""
+    def create():
+        import boto3
+        return boto3.client(service, region_name="us-east-1", config=aws_config(), **aws_credentials())
+    return get_client(service, create)
+
+
+def s3_client():
+    return aws_client("s3")
+
+
+def sagemaker_runtime_client():
+    return aws_client("sagemaker-runtime")
+
+
+def pinecone_client(api_key):
+    def create():
+        from pinecone import Pinecone
+        return Pinecone(api_key=api_key)
+    return get_client(("pinecone", api_key), create)
+
+
+def pinecone_index(api_key, index_name):
+    return get_client(
+        ("pinecone-index", api_key, index_name),
+        lambda: pinecone_client(api_key).Index(index_name),
+    )
+
+
+def embedding_generator(endpoint_name, region, embedding_dimension):
+    """The process-wide EmbeddingGenerator (utils/embeddings.py) for a SageMaker endpoint."""
+    def create():
+        from utils.embeddings import EmbeddingGenerator
+        return EmbeddingGenerator(endpoint_name=endpoint_name, region=region, embedding_dimension=embedding_dimension)
+    return get_client(("embedder", endpoint_name, region, embedding_dimension), create)
+
+
+def openai_client(api_key):
+    def create():
+        from openai import OpenAI
+        return OpenAI(api_key=api_key)
+    return get_client(("openai", api_key), create)
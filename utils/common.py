@@ -1,4 +1,3 @@
-import boto3
 from pathlib import Path
 import pandas as pd
 import base64
@@ -8,6 +7,8 @@ import sys
 import fitz  # PyMuPDF
 import json
 import streamlit as st
+from utils.clients import s3_client
+from utils.job_store import load_job_store, load_job_store_from_s3, parse_extracted
 
 home_directory = os.path.dirname(os.path.abspath(sys.argv[0])) 
 def includeCss(st, filename):
@@ -62,31 +63,30 @@ def loadFont():
 def logger(msg):
     os.write(1,f"{msg}\n".encode('utf-8'))
 
-def find_record_by_ids(vdb_list, file_path):
-    df = pd.read_excel(file_path)
-
-    job_list = json.loads('[]')
-    
-    if vdb_list:
-        for job in vdb_list:
-            job_id = job['id']
-            extracted, web_url, post_dt = find_record_by_id(job_id[4:], df)
-            if extracted:
-                post_json = json.loads(extracted)
-                post_json['job_id'] = job_id
-                post_json['web_url'] = web_url
-                post_json['posted_date'] = post_dt
-                job_list.append(post_json)
-    else:
-        job_list = get_all_records(df)
-
-    return job_list
+def find_record_by_ids(vdb_list, file_path, filters=None):
+    # The spreadsheet is converted and indexed once per process (see utils/job_store.py);
+    # without Pinecone results, `filters` are applied by the local filter index
+    return load_job_store(file_path).find_records(vdb_list, filters)
+
+def iter_records(store, match_pages):
+    # Jobs of each search_stream page as it arrives; no matches at all falls
+    # back to every job, as find_records does for an empty result list
+    found = False
+    for page in match_pages:
+        found = True
+        yield from store.get_many(match['id'] for match in page)
+    if not found:
+        yield from store.find_records([])
+
+def iter_record_by_ids(match_pages, file_path):
+    """Streaming find_record_by_ids for the pages of PineconeDatabase.search_stream."""
+    yield from iter_records(load_job_store(file_path), match_pages)
 
 def get_all_records(df):
     job_list = json.loads('[]')
 
     for index, row in df.iterrows():
-        post_json = json.loads(row['extracted_cleaned'].replace("True", "true").replace("False", "false"))
+        post_json = parse_extracted(row['extracted_cleaned'])
         post_json['job_id'] = f"job_{row['id']}"
         post_json['web_url'] = row['web_url']
         post_json['posted_date'] = row['posted_date'].dt.strftime('%m/%d/%Y')
@@ -101,39 +101,26 @@ def safe_json_loads(val):
         print(f"Error parsing JSON: {val}")
         return None
 
+def get_s3_client():
+    # Created on first use and shared by the process (see utils/clients.py)
+    return s3_client()
+
 def read_excel_from_s3(bucket, key):
     """
     Helper function that reads an Excel file from S3 into a Pandas DataFrame.
     """
-    s3 = boto3.client(
-        "s3",
-        region_name="us-east-1",
-        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID", st.secrets["aws"]["access_key_id"]),
-        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY", st.secrets["aws"]["secret_access_key"])
-    )
+    s3 = get_s3_client()
     response = s3.get_object(Bucket=bucket, Key=key)
     # response['Body'] is a stream; wrap it with BytesIO before passing to pandas
     return pd.read_excel(BytesIO(response['Body'].read()))
 
-def find_record_by_ids_from_s3(vdb_list, bucket, key):
-    df = read_excel_from_s3(bucket, key)
+def find_record_by_ids_from_s3(vdb_list, bucket, key, filters=None):
+    # Local Parquet copy revalidated by ETag; S3 is only read when the file changes
+    return load_job_store_from_s3(get_s3_client, bucket, key).find_records(vdb_list, filters)
 
-    job_list = json.loads('[]')
-
-    if vdb_list:    
-        for job in vdb_list:
-            job_id = job['id']
-            extracted, web_url, post_dt = find_record_by_id(job_id[4:], df)
-            if extracted:
-                post_json = json.loads(extracted)
-                post_json['job_id'] = job_id
-                post_json['web_url'] = web_url
-                post_json['posted_date'] = post_dt
-                job_list.append(post_json)
-    else:
-        job_list = get_all_records(df)
-
-    return job_list
+def iter_record_by_ids_from_s3(match_pages, bucket, key):
+    """Streaming find_record_by_ids_from_s3 for the pages of PineconeDatabase.search_stream."""
+    yield from iter_records(load_job_store_from_s3(get_s3_client, bucket, key), match_pages)
 
 def find_record_by_id(target_id, df):
     """
@@ -163,8 +150,11 @@ def find_record_by_id(target_id, df):
     else:
         posted_date = pd.to_datetime(record['posted_date']).strftime('%m/%d/%Y')
 
-    # Clean up the 'extracted_cleaned' value
-    extracted_cleaned = record['extracted_cleaned'].replace("True", "true").replace("False", "false")
+    # Clean up the 'extracted_cleaned' value (as plain JSON); a missing payload is no record
+    extracted = parse_extracted(record['extracted_cleaned'])
+    if extracted is None:
+        return None
+    extracted_cleaned = json.dumps(extracted)
 
     # Return the desired values
     return extracted_cleaned, record['web_url'], posted_date
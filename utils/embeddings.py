@@ -1,32 +1,46 @@
-import boto3
+import io
 import json
 import numpy as np
-import streamlit as st
+from utils.clients import sagemaker_runtime_client
+
+# Response formats the embedder can ask the endpoint for (the Accept header).
+# The binary ones decode straight into the batch array without building a
+# Python float per value; "json" is the fallback every endpoint supports.
+NPY_CONTENT_TYPE = "application/x-npy"  # numpy .npy bytes
+FLOAT32_CONTENT_TYPE = "application/octet-stream"  # raw little-endian float32
+JSON_CONTENT_TYPE = "application/json"
+RESPONSE_FORMATS = {
+    "npy": NPY_CONTENT_TYPE,
+    "float32": FLOAT32_CONTENT_TYPE,
+    "json": JSON_CONTENT_TYPE,
+}
+# invoke_endpoint error codes meaning the model server cannot produce the Accept type
+UNSUPPORTED_ACCEPT_ERRORS = ("ModelError", "ValidationException")
 
 class EmbeddingGenerator:
     """Class for embedding generation using SageMaker endpoint"""
     
-    def __init__(self, endpoint_name, region, embedding_dimension=1024):
+    def __init__(self, endpoint_name, region, embedding_dimension=1024, response_format="npy"):
         """
         Initialize with SageMaker endpoint
         Args:
             endpoint_name: Name of the SageMaker endpoint
             region: AWS region
             embedding_dimension: Dimension of the embedding vectors
+            response_format: Response to ask for, a key of RESPONSE_FORMATS
+                (falls back to "json" if the endpoint rejects it)
         """
         self.endpoint_name = endpoint_name
         self.region = region
         self.embedding_dimension = embedding_dimension
-        
-        # Initialize SageMaker runtime client
-        self.client = boto3.client(
-            "sagemaker-runtime",
-            region_name="us-east-1",
-            aws_access_key_id=st.secrets["aws"]["access_key_id"],
-            aws_secret_access_key=st.secrets["aws"]["secret_access_key"]
-        )
+        self.response_format = response_format
         print(f"Initialized SageMaker embedder for endpoint: {endpoint_name}")
 
+    @property
+    def client(self):
+        """SageMaker runtime client, created on first use and shared by the process (see utils/clients.py)."""
+        return sagemaker_runtime_client()
+
     def encode(self, texts, batch_size=100, convert_to_tensor=False):
         """
         Compatibility method to match the interface expected by precompute_embeddings_for_df
@@ -37,7 +51,7 @@ class EmbeddingGenerator:
             convert_to_tensor: Whether to convert to tensor (ignored)
             
         Returns:
-            List of embedding vectors
+            float32 array of embedding vectors, one row per text
         """
         return self.generate_embeddings(texts)
     
@@ -48,20 +62,68 @@ class EmbeddingGenerator:
             texts: String or list of texts to embed
             instructions: Optional instructions for the model
         Returns:
-            List of embedding vectors
+            float32 array of shape (len(texts), embedding_dimension), one row per text
         """
         # Ensure texts is a list
         if not isinstance(texts, list):
             texts = [texts]
         
         return self._generate_with_sagemaker(texts, instructions)
-    
+
+    def _invoke(self, payload):
+        """
+        Invokes the endpoint asking for self.response_format; if the endpoint
+        rejects that Accept type, asks again for JSON and keeps JSON from then on.
+        Returns (body bytes, response content type).
+        """
+        body = json.dumps(payload)
+        accept = RESPONSE_FORMATS[self.response_format]
+        try:
+            response = self.client.invoke_endpoint(
+                EndpointName=self.endpoint_name,
+                ContentType="application/json",
+                Accept=accept,
+                Body=body
+            )
+        except Exception as e:
+            code = getattr(e, "response", {}).get("Error", {}).get("Code")
+            if accept == JSON_CONTENT_TYPE or code not in UNSUPPORTED_ACCEPT_ERRORS:
+                raise
+            print(f"[EmbeddingGenerator] Endpoint rejected Accept {accept} ({code}); using JSON responses")
+            self.response_format = "json"
+            response = self.client.invoke_endpoint(
+                EndpointName=self.endpoint_name,
+                ContentType="application/json",
+                Accept=JSON_CONTENT_TYPE,
+                Body=body
+            )
+        return response["Body"].read(), response.get("ContentType", JSON_CONTENT_TYPE)
+
+    def _decode(self, body, content_type):
+        """
+        The embedding in a response body as a 1-D float32 array (a view of the
+        body where possible, no per-element Python objects).
+        """
+        if content_type.startswith(NPY_CONTENT_TYPE):
+            embedding = first_row(np.load(io.BytesIO(body), allow_pickle=False))
+        elif content_type.startswith(FLOAT32_CONTENT_TYPE):
+            embedding = np.frombuffer(body, dtype="<f4")
+        else:
+            embedding = json_embedding(json.loads(body))
+        # If the embedding is a nested list that wasn't properly flattened, flatten one level.
+        embedding = np.asarray(embedding, dtype=np.float32).ravel()
+
+        # If the returned vector length is a multiple of the expected dimension,
+        # assume it contains multiple token embeddings that need pooling.
+        if embedding.size != self.embedding_dimension and embedding.size % self.embedding_dimension == 0:
+            embedding = embedding.reshape(-1, self.embedding_dimension).mean(axis=0)
+        return embedding
+
     def _generate_with_sagemaker(self, texts, instructions=None):
-        """Generate embeddings using SageMaker endpoint"""
+        """Generate embeddings using SageMaker endpoint, one row of the batch array per text"""
+        embeddings = np.zeros((len(texts), self.embedding_dimension), dtype=np.float32)
         try:
-            embeddings = []
-            
-            for text in texts:
+            for i, text in enumerate(texts):
                 # For E5 models, a common format is:
                 payload = {
                     "inputs": [text]  # Send as a list of strings
@@ -74,65 +136,38 @@ class EmbeddingGenerator:
                         "inputs": [formatted_text]
                     }
                 
-                # Invoke the SageMaker endpoint
-                response = self.client.invoke_endpoint(
-                    EndpointName=self.endpoint_name,
-                    ContentType="application/json",
-                    Body=json.dumps(payload)
-                )
-                
-                # Parse the response
-                response_body = json.loads(response["Body"].read())
-                
-                # Debugging output to inspect response structure
-                # print(f"Response type: {type(response_body)}")
-                # if isinstance(response_body, list):
-                #     print(f"Response length: {len(response_body)}")
-                #     if len(response_body) > 0:
-                #         print(f"First element type: {type(response_body[0])}")
-                #         print(f"First element length: {len(response_body[0])}")
-                
-                # Extract embedding
-                embedding = None
-                if isinstance(response_body, list) and len(response_body) > 0:
-                    if isinstance(response_body[0], list) and len(response_body[0]) > 0:
-                        if isinstance(response_body[0][0], list):
-                            # It's a 3D array, extract the innermost array
-                            embedding = response_body[0][0]
-                        else:
-                            # It's a 2D array
-                            embedding = response_body[0]
-                    else:
-                        # It's a 1D array or other structure
-                        embedding = response_body
-                else:
-                    # It's not a list
-                    embedding = response_body
-                
-                # If the embedding is a nested list that wasn't properly flattened, flatten one level.
-                if embedding is not None:
-                    if isinstance(embedding, list) and len(embedding) > 0 and isinstance(embedding[0], list):
-                        flat_embedding = [item for sublist in embedding for item in sublist]
-                        embedding = flat_embedding
-    
-                    # If the returned vector length is a multiple of the expected dimension,
-                    # assume it contains multiple token embeddings that need pooling.
-                    if len(embedding) != self.embedding_dimension and len(embedding) % self.embedding_dimension == 0:
-                        n = len(embedding) // self.embedding_dimension
-                        # Reshape into a matrix with shape (n, embedding_dimension)
-                        embedding_matrix = np.array(embedding).reshape(n, self.embedding_dimension)
-                        # Pool across tokens, e.g., by taking the mean
-                        pooled_embedding = embedding_matrix.mean(axis=0)
-                        embedding = pooled_embedding.tolist()
-                    
-                    embeddings.append(embedding)
+                body, content_type = self._invoke(payload)
+                embedding = self._decode(body, content_type)
+                if embedding.size == self.embedding_dimension:
+                    embeddings[i] = embedding
                 else:
-                    print("Warning: Could not extract embedding from response")
-                    embeddings.append([0.0] * self.embedding_dimension)
+                    print(f"Warning: Could not extract embedding from response ({embedding.size} values)")
             
             return embeddings
             
         except Exception as e:
             print(f"Error with SageMaker embedding: {str(e)}")
             # Return zero vectors as fallback
-            return [[0.0] * self.embedding_dimension] * len(texts)
+            return np.zeros((len(texts), self.embedding_dimension), dtype=np.float32)
+
+
+def first_row(array):
+    """The embedding part of an array response, picked like json_embedding."""
+    if array.ndim >= 3:
+        return array[0][0]
+    if array.ndim == 2:
+        return array[0]
+    return array
+
+
+def json_embedding(response_body):
+    """The embedding part of a JSON response body (the first row of a 2D or 3D list)."""
+    if isinstance(response_body, list) and len(response_body) > 0:
+        if isinstance(response_body[0], list) and len(response_body[0]) > 0:
+            if isinstance(response_body[0][0], list):
+                # It's a 3D array, extract the innermost array
+                return response_body[0][0]
+            # It's a 2D array
+            return response_body[0]
+    # It's a 1D array or other structure
+    return response_body
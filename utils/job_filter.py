@@ -0,0 +1,184 @@
+from datetime import date, datetime
+import numpy as np
+
+# Metadata fields the Start Match filters use, as stored in the Pinecone index
+CATEGORICAL_FIELDS = ['job_title', 'emp_type', 'exp_level', 'domain', 'location', 'visa_sponsor']
+RANGE_FIELDS = ['salary_range_from', 'salary_range_to', 'posted_day']
+FILTER_FIELDS = CATEGORICAL_FIELDS + RANGE_FIELDS
+
+# Experience levels job_metadata derives from the mandatory skills' minimum years
+EXP_LEVELS = ['Entry-level', 'Mid-level', 'Senior']
+
+# "Date Posted" choices in app.py -> how many days back they reach
+POST_DT_DAYS = {"Last 24 hours": 1, "Past Week": 7, "Past Month": 30}
+
+# Pay periods in the wage details -> multiplier to a yearly salary
+PAY_PERIODS_PER_YEAR = {"hourly": 2080, "daily": 260, "weekly": 52, "monthly": 12}
+
+EPOCH = date(1970, 1, 1)
+
+
+def first_or(values, default):
+    return values[0] if isinstance(values, list) and values else default
+
+def to_day(value):
+    """Days since 1970-01-01 for a date, datetime or 'mm/dd/yyyy' / ISO string; NaN if unknown."""
+    if value is None or value == '':
+        return np.nan
+    if isinstance(value, str):
+        for fmt in ('%m/%d/%Y', '%Y-%m-%d'):
+            try:
+                value = datetime.strptime(value, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            return np.nan
+    if isinstance(value, datetime):
+        value = value.date()
+    return float((value - EPOCH).days)
+
+def salary_range(details):
+    """(from, to) yearly salary from the wage details, NaN where there is no wage."""
+    lows = []
+    highs = []
+    for wage in details.get("wage", []) or []:
+        if not isinstance(wage, dict):
+            continue
+        per_year = PAY_PERIODS_PER_YEAR.get(str(wage.get("pay_type", "")).lower(), 1)
+        for key, bucket in (("min", lows), ("max", highs)):
+            try:
+                bucket.append(float(wage.get(key)) * per_year)
+            except (TypeError, ValueError):
+                pass
+    return (min(lows) if lows else np.nan, max(highs) if highs else np.nan)
+
+def job_metadata(job, posted_date=None):
+    """
+    The filter metadata of a job payload, derived the same way the vector
+    database ingestion (vdb/filtering.ipynb, format_job_for_embedding) derives
+    the Pinecone metadata. Salaries come from the wage details (yearly), and
+    posted_day from the posting date.
+    """
+    details = job.get("details", {})
+
+    location = "Remote"
+    location_item = first_or(details.get("location", []), None)
+    if isinstance(location_item, dict):
+        location = ", ".join(filter(None, [
+            location_item.get("city", ""), location_item.get("state", ""), location_item.get("country", "")
+        ]))
+
+    employment_data = details.get("employment_type", [])
+    if not employment_data and details.get("tax_terms"):
+        employment_data = details.get("tax_terms", ["Full-time"])
+
+    experience_level = EXP_LEVELS[0]
+    if job.get("mandatory", {}).get("hard_skills"):
+        max_years = 0
+        for skill in job["mandatory"]["hard_skills"]:
+            min_years = first_or(skill.get("minyears", [0]), 0)
+            if not isinstance(min_years, (int, float)):
+                try:
+                    min_years = float(min_years)
+                except (ValueError, TypeError):
+                    min_years = 0
+            max_years = max(max_years, min_years)
+        if max_years >= 7:
+            experience_level = EXP_LEVELS[2]
+        elif max_years >= 3:
+            experience_level = EXP_LEVELS[1]
+
+    salary_from, salary_to = salary_range(details)
+    return {
+        "job_title": first_or(details.get("job_title", ["Unknown"]), "Unknown"),
+        "emp_type": first_or(employment_data, "Full-time"),
+        "exp_level": experience_level,
+        "domain": first_or(details.get("company_industry", []), "Technology"),
+        "location": location,
+        "visa_sponsor": "No",  # not extracted from the postings yet
+        "salary_range_from": salary_from,
+        "salary_range_to": salary_to,
+        "posted_day": to_day(posted_date),
+    }
+
+
+class JobFilterIndex:
+    """
+    In-memory index over job metadata answering the Pinecone-style filters
+    built in app.py ({field: {'$eq' | '$gte' | '$lte': value}}, or a bare value
+    for $eq) without Pinecone.
+
+    Categorical fields keep one boolean bitmap per value; salary and posting
+    day keep their values sorted, so a range is a binary search. A filter is
+    the AND of the bitmaps. As in Pinecone, a job without the field never
+    matches a condition on it.
+
+    'post_dt' with one of the "Date Posted" choices (POST_DT_DAYS) is read as
+    "posted within that many days".
+    """
+
+    def __init__(self, columns):
+        self.columns = columns  # field -> [value per row], as given
+        self.size = len(next(iter(columns.values()))) if columns else 0
+        self.bitmaps = {}  # field -> {value: bool array}
+        self.sorted_values = {}  # field -> (sorted values, their rows)
+        for field in CATEGORICAL_FIELDS:
+            values = np.asarray(columns.get(field, [None] * self.size), dtype=object)
+            bitmaps = {}
+            for value in set(values.tolist()):
+                if value is not None:
+                    bitmaps[value] = values == value
+            self.bitmaps[field] = bitmaps
+        for field in RANGE_FIELDS:
+            values = np.asarray(columns.get(field, [np.nan] * self.size), dtype=float)
+            rows = np.flatnonzero(~np.isnan(values))
+            order = rows[np.argsort(values[rows], kind='stable')]
+            self.sorted_values[field] = (values[order], order)
+
+    def __len__(self):
+        return self.size
+
+    def _range_mask(self, field, low=None, high=None):
+        values, rows = self.sorted_values[field]
+        start = 0 if low is None else np.searchsorted(values, low, side='left')
+        end = len(values) if high is None else np.searchsorted(values, high, side='right')
+        mask = np.zeros(self.size, dtype=bool)
+        mask[rows[start:end]] = True
+        return mask
+
+    def _condition_mask(self, field, op, value):
+        if field == 'post_dt':
+            if op != '$eq' or value not in POST_DT_DAYS:
+                raise ValueError(f"Unsupported post_dt filter: {op} {value!r}")
+            return self._range_mask('posted_day', low=to_day(date.today()) - POST_DT_DAYS[value])
+        if field in self.bitmaps:
+            if op != '$eq':
+                raise ValueError(f"Unsupported operator {op} for {field}")
+            bitmap = self.bitmaps[field].get(value)
+            return bitmap if bitmap is not None else np.zeros(self.size, dtype=bool)
+        if field in self.sorted_values:
+            if field == 'posted_day':
+                value = to_day(value)
+            if op == '$eq':
+                return self._range_mask(field, low=value, high=value)
+            if op == '$gte':
+                return self._range_mask(field, low=value)
+            if op == '$lte':
+                return self._range_mask(field, high=value)
+            raise ValueError(f"Unsupported operator {op} for {field}")
+        raise ValueError(f"Unknown filter field: {field}")
+
+    def mask(self, filters):
+        """Boolean array of the rows matching every condition in `filters`."""
+        mask = np.ones(self.size, dtype=bool)
+        for field, condition in (filters or {}).items():
+            if not isinstance(condition, dict):
+                condition = {'$eq': condition}
+            for op, value in condition.items():
+                mask &= self._condition_mask(field, op, value)
+        return mask
+
+    def rows(self, filters):
+        """Row positions matching `filters`, in row order."""
+        return np.flatnonzero(self.mask(filters))
@@ -0,0 +1,380 @@
+import ast
+import json
+import os
+import threading
+import time
+from io import BytesIO
+import msgpack
+import pandas as pd
+import pyarrow.parquet as pq
+from utils.job_filter import FILTER_FIELDS, JobFilterIndex, job_metadata
+
+# Columns of the converted postings file; payloads are msgpack-encoded job dicts,
+# followed by the metadata the Start Match filters use (see utils/job_filter.py)
+JOB_STORE_COLUMNS = ['job_id', 'payload_msgpack', 'web_url', 'posted_date'] + FILTER_FIELDS
+
+JOB_CACHE_DIR = './data/job_cache'  # local copies of postings files kept in S3
+S3_REVALIDATE_SECONDS = 60  # how long a revalidated S3 copy is used without asking S3 again
+
+
+def job_store_path(file_path):
+    """Where the Parquet copy of a postings spreadsheet is kept."""
+    return os.path.splitext(file_path)[0] + '.parquet'
+
+def job_store_file_is_current(parquet_path):
+    """False if the file is missing or was written in an older column layout."""
+    if not os.path.exists(parquet_path):
+        return False
+    return set(JOB_STORE_COLUMNS) <= set(pq.read_schema(parquet_path).names)
+
+def parse_extracted(extracted):
+    """
+    Parses an extracted_cleaned cell into the job dict. Cells are JSON, but
+    some were written with Python literals (True/False/None); those are read
+    with ast.literal_eval instead of replacing the words everywhere, which
+    would also change text such as "Trueblood" inside strings. The old
+    replace is kept only as the last resort. Returns None for empty cells.
+    """
+    if not isinstance(extracted, str) or not extracted.strip():
+        return None
+    try:
+        return json.loads(extracted)
+    except ValueError:
+        pass
+    try:
+        value = ast.literal_eval(extracted)
+        if isinstance(value, dict):
+            return value
+    except (ValueError, SyntaxError):
+        pass
+    return json.loads(extracted.replace("True", "true").replace("False", "false"))
+
+def format_posted_date(value):
+    if pd.isna(value):
+        return None
+    return pd.to_datetime(value).strftime('%m/%d/%Y')
+
+def postings_to_frame(df):
+    """
+    Converts the postings spreadsheet (id, extracted_cleaned, web_url,
+    posted_date) into the job store columns: job_id as used by Pinecone, the
+    parsed payload packed with msgpack, posted_date already formatted, and
+    the filter metadata. Rows without a payload are dropped.
+    """
+    rows = []
+    for job_id, extracted, web_url, posted_date in zip(
+        df['id'], df['extracted_cleaned'], df['web_url'], df['posted_date']
+    ):
+        payload = parse_extracted(extracted)
+        if payload is None:
+            print(f"[postings_to_frame] Skipping job_{job_id}: no extracted_cleaned")
+            continue
+        posted_date = format_posted_date(posted_date)
+        metadata = job_metadata(payload, posted_date)
+        rows.append((
+            f"job_{job_id}",
+            msgpack.packb(payload, use_bin_type=True),
+            web_url,
+            posted_date,
+            *(metadata[field] for field in FILTER_FIELDS),
+        ))
+    return pd.DataFrame(rows, columns=JOB_STORE_COLUMNS)
+
+def excel_to_parquet(excel, parquet_path):
+    """
+    Converts a postings spreadsheet (a path or a file-like object) into the job
+    store file. The file is replaced atomically, so readers never see half of it.
+    """
+    frame = postings_to_frame(pd.read_excel(excel))
+    tmp_path = parquet_path + '.tmp'
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, parquet_path)
+    print(f"[excel_to_parquet] Converted {len(frame)} postings to {parquet_path}")
+    return frame
+
+
+class JobStore:
+    """
+    Job details by job_id, shared by every session of the process.
+
+    Jobs are kept by column (job_ids, parsed payloads, web_urls, posted dates)
+    with a job_id -> row index, so a lookup is a dict hit plus building the job
+    dict. Payloads stay msgpack bytes until a job is first looked up, so
+    loading the store decodes nothing and a search only decodes its hits.
+
+    Match results can then be kept as compact (job_id, match_scores) records
+    and the full job JSON looked up only for the rows being displayed.
+
+    The filter metadata columns back a JobFilterIndex, so the Start Match
+    filters can be applied without Pinecone (filter_jobs).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self._index = {}  # job_id -> row
+        self._job_ids = []
+        self._payloads = []  # msgpack bytes, replaced by the dict once decoded
+        self._web_urls = []
+        self._posted_dates = []
+        self._metadata = {field: [] for field in FILTER_FIELDS}
+        self._filter_index = None  # built on first use, dropped when rows change
+
+    def __len__(self):
+        return len(self._job_ids)
+
+    def __contains__(self, job_id):
+        return job_id in self._index
+
+    ###########################################################################
+    # Loading
+    ###########################################################################
+    def load_frame(self, frame):
+        """Replaces the contents with a frame in the JOB_STORE_COLUMNS layout."""
+        with self._lock:
+            self._clear()
+            self._job_ids = frame['job_id'].tolist()
+            self._payloads = frame['payload_msgpack'].tolist()
+            self._web_urls = frame['web_url'].tolist()
+            self._posted_dates = [
+                None if pd.isna(value) else value for value in frame['posted_date']
+            ]
+            self._metadata = {field: frame[field].tolist() for field in FILTER_FIELDS}
+            for row, job_id in enumerate(self._job_ids):
+                self._index.setdefault(job_id, row)  # first posting wins, like find_record_by_id
+        print(f"[JobStore] Loaded {len(self)} jobs")
+
+    def load_parquet(self, parquet_path):
+        self.load_frame(pd.read_parquet(parquet_path, columns=JOB_STORE_COLUMNS))
+
+    def add(self, job_list):
+        """Adds (or replaces) jobs given as full job dicts."""
+        with self._lock:
+            for job in job_list:
+                payload = {
+                    key: value for key, value in job.items()
+                    if key not in ('job_id', 'web_url', 'posted_date', 'match_scores')
+                }
+                metadata = job_metadata(payload, job.get('posted_date'))
+                row = self._index.get(job['job_id'])
+                if row is None:
+                    row = len(self._job_ids)
+                    self._index[job['job_id']] = row
+                    self._job_ids.append(job['job_id'])
+                    self._payloads.append(payload)
+                    self._web_urls.append(job.get('web_url'))
+                    self._posted_dates.append(job.get('posted_date'))
+                    for field in FILTER_FIELDS:
+                        self._metadata[field].append(metadata[field])
+                else:
+                    self._payloads[row] = payload
+                    self._web_urls[row] = job.get('web_url')
+                    self._posted_dates[row] = job.get('posted_date')
+                    for field in FILTER_FIELDS:
+                        self._metadata[field][row] = metadata[field]
+            self._filter_index = None
+
+    ###########################################################################
+    # Lookups
+    ###########################################################################
+    def _payload(self, row):
+        # Caller holds the lock.
+        payload = self._payloads[row]
+        if isinstance(payload, bytes):
+            payload = msgpack.unpackb(payload, raw=False)
+            self._payloads[row] = payload
+        return payload
+
+    def _job(self, row):
+        # A new dict per call: callers attach match_scores to it.
+        job = dict(self._payload(row))
+        job['job_id'] = self._job_ids[row]
+        job['web_url'] = self._web_urls[row]
+        job['posted_date'] = self._posted_dates[row]
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._index.get(job_id)
+            return None if row is None else self._job(row)
+
+    def get_many(self, job_ids):
+        """The jobs for `job_ids`, in that order, skipping unknown ids."""
+        with self._lock:
+            rows = [self._index.get(job_id) for job_id in job_ids]
+            return [self._job(row) for row in rows if row is not None]
+
+    def all_jobs(self):
+        with self._lock:
+            return [self._job(row) for row in range(len(self._job_ids))]
+
+    def filter_jobs(self, filters):
+        """The jobs matching Pinecone-style metadata filters (see JobFilterIndex)."""
+        with self._lock:
+            if self._filter_index is None:
+                self._filter_index = JobFilterIndex(self._metadata)
+            rows = self._filter_index.rows(filters)
+            # Duplicate postings: only the row the job_id index points to
+            return [
+                self._job(row) for row in rows.tolist()
+                if self._index.get(self._job_ids[row]) == row
+            ]
+
+    def find_records(self, vdb_list, filters=None):
+        """
+        The jobs for a Pinecone result list ([{'id': job_id, ...}]); what
+        find_record_by_ids returns. When the list is empty, every job, or the
+        jobs matching `filters` if given.
+        """
+        if not vdb_list:
+            if filters:
+                return self.filter_jobs(filters)
+            return self.all_jobs()
+        return self.get_many(job['id'] for job in vdb_list)
+
+    def with_details(self, match_records):
+        """
+        Joins compact (job_id, match_scores) records with the job details, as
+        the job dicts calculate_match_score returns without compact. The stored
+        jobs are not modified.
+        """
+        match_results = []
+        with self._lock:
+            for job_id, match_scores in match_records:
+                row = self._index.get(job_id)
+                if row is not None:
+                    job = self._job(row)
+                    job['match_scores'] = match_scores
+                    match_results.append(job)
+        return match_results
+
+
+job_store = JobStore()
+job_store_source = {}  # what the process-wide store was loaded from: {'source': ..., 'version': ...}
+job_store_load_lock = threading.Lock()
+job_store_reload_listeners = []
+
+def get_job_store():
+    """The process-wide JobStore."""
+    return job_store
+
+def on_job_store_reload(listener):
+    """
+    Registers a function called (without arguments) whenever the process-wide
+    store loads a new postings corpus, e.g. to drop cached search results.
+    """
+    job_store_reload_listeners.append(listener)
+
+def notify_job_store_reload():
+    for listener in list(job_store_reload_listeners):
+        try:
+            listener()
+        except Exception as e:
+            print("[notify_job_store_reload] Listener failed:", str(e))
+
+def load_job_store(file_path):
+    """
+    The process-wide JobStore loaded from the postings spreadsheet at
+    `file_path`. The spreadsheet is converted to Parquet next to it the first
+    time (and whenever it changes); later calls reuse the loaded store.
+    """
+    mtime = os.path.getmtime(file_path)
+    with job_store_load_lock:
+        if job_store_source.get('source') == file_path and job_store_source.get('version') == mtime:
+            return job_store
+        parquet_path = job_store_path(file_path)
+        if not job_store_file_is_current(parquet_path) or os.path.getmtime(parquet_path) < mtime:
+            excel_to_parquet(file_path, parquet_path)
+        job_store.load_parquet(parquet_path)
+        job_store_source.clear()
+        job_store_source.update(source=file_path, version=mtime)
+    notify_job_store_reload()
+    return job_store
+
+###############################################################################
+# Postings file kept in S3
+###############################################################################
+def s3_object_version(head):
+    """ETag of a head_object/get_object response, or Last-Modified if there is none."""
+    etag = head.get('ETag')
+    if etag:
+        return etag
+    last_modified = head.get('LastModified')
+    return str(last_modified) if last_modified is not None else None
+
+def s3_cache_paths(bucket, key, cache_dir):
+    name = f"{bucket}_{key}".replace('/', '_')
+    base = os.path.join(cache_dir, os.path.splitext(name)[0])
+    return base + '.parquet', base + '.meta.json'
+
+def read_s3_cache_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def sync_s3_postings(client, bucket, key, cache_dir=JOB_CACHE_DIR):
+    """
+    Keeps a Parquet copy of the postings spreadsheet at s3://bucket/key under
+    cache_dir. Asks S3 for the object's ETag (HEAD, no transfer) and only
+    downloads and converts the spreadsheet when it differs from the cached one.
+    If S3 cannot be reached, the cached copy is used as is.
+
+    Returns (parquet_path, version).
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    parquet_path, meta_path = s3_cache_paths(bucket, key, cache_dir)
+    meta = read_s3_cache_meta(meta_path)
+    cached = meta.get('version') if job_store_file_is_current(parquet_path) else None
+
+    try:
+        version = s3_object_version(client.head_object(Bucket=bucket, Key=key))
+    except Exception as e:
+        if cached is None:
+            raise
+        print(f"[sync_s3_postings] Could not revalidate s3://{bucket}/{key}, using the cached copy:", str(e))
+        return parquet_path, cached
+
+    if version is not None and version == cached:
+        return parquet_path, cached
+
+    print(f"[sync_s3_postings] Downloading s3://{bucket}/{key} ({version})")
+    response = client.get_object(Bucket=bucket, Key=key)
+    version = s3_object_version(response) or version
+    excel_to_parquet(BytesIO(response['Body'].read()), parquet_path)
+    with open(meta_path, 'w') as f:
+        json.dump({'bucket': bucket, 'key': key, 'version': version}, f)
+    return parquet_path, version
+
+def load_job_store_from_s3(client, bucket, key, cache_dir=JOB_CACHE_DIR,
+                           revalidate_after=S3_REVALIDATE_SECONDS):
+    """
+    The process-wide JobStore loaded from the postings spreadsheet in S3,
+    through the local cache of sync_s3_postings. S3 is asked again at most
+    every `revalidate_after` seconds; in between, calls reuse the loaded store.
+
+    `client` is a boto3 S3 client, or anything with head_object/get_object
+    (e.g. a moto or botocore Stubber client in tests); it may also be a
+    function returning one, which is only called when S3 is asked.
+    """
+    source = f"s3://{bucket}/{key}"
+    reloaded = False
+    with job_store_load_lock:
+        if (job_store_source.get('source') == source
+                and time.monotonic() - job_store_source.get('checked', 0) < revalidate_after):
+            return job_store
+        if callable(client) and not hasattr(client, 'head_object'):
+            client = client()
+        parquet_path, version = sync_s3_postings(client, bucket, key, cache_dir)
+        if job_store_source.get('source') != source or job_store_source.get('version') != version:
+            job_store.load_parquet(parquet_path)
+            job_store_source.clear()
+            job_store_source.update(source=source, version=version)
+            reloaded = True
+        job_store_source['checked'] = time.monotonic()
+    if reloaded:
+        notify_job_store_reload()
+    return job_store
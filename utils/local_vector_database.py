@@ -0,0 +1,225 @@
+import json
+import os
+import faiss
+import numpy as np
+from utils.job_filter import CATEGORICAL_FIELDS, FILTER_FIELDS, JobFilterIndex, job_metadata
+
+TOP_K = 200  # same as PineconeDatabase.search
+HNSW_M = 32  # graph neighbors per vector
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 256  # >= TOP_K; higher is slower with better recall
+HNSW_EF_SEARCH_MAX = 1024  # cap when widening the search for selective filters
+EXACT_SEARCH_MAX_ROWS = 5000  # filters leaving this few jobs are searched exactly
+EMBED_BATCH = 32
+
+
+def job_embedding_text(job):
+    """
+    The text a job is embedded from, in the layout the vector database
+    ingestion (vdb/filtering.ipynb, format_job_for_embedding) uses, so local
+    and Pinecone vectors are comparable.
+    """
+    metadata = job_metadata(job)
+    details = job.get("details", {})
+    company_name = (details.get("company_name") or ["Unknown"])[0]
+
+    def joined_skills(items):
+        skills = []
+        for item in items:
+            for group in item.get("skill") or []:
+                skills.append(" ".join(group) if isinstance(group, list) else group)
+        return skills
+
+    skills = joined_skills(job.get("mandatory", {}).get("hard_skills", []))
+    skills_text = "Required skills: " + ", ".join(skills) if skills else ""
+    responsibilities = joined_skills(job.get("responsibility", {}).get("hard_skills", []))
+    responsibilities_text = "Responsibilities: " + ", ".join(responsibilities) if responsibilities else ""
+
+    job_text = f"""
+Job Title: {metadata['job_title']}
+Company: {company_name}
+Location: {metadata['location']}
+Employment Type: {metadata['emp_type']}
+Experience Level: {metadata['exp_level']}
+Industry/Domain: {metadata['domain']}
+Visa Sponsorship: {metadata['visa_sponsor']}
+
+{skills_text}
+
+{responsibilities_text}
+
+Job Description Summary:
+This is a {metadata['emp_type']} position for a {metadata['job_title']} located in {metadata['location']}.
+The role requires {metadata['exp_level']} experience in the {metadata['domain']} industry.
+Visa sponsorship is {metadata['visa_sponsor']}.
+"""
+    return job_text.strip()
+
+def normalize_rows(vectors):
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+class LocalVectorDatabase:
+    """
+    On-box replacement for PineconeDatabase: a FAISS HNSW index over the job
+    vectors (cosine, like the Pinecone index) plus a JobFilterIndex over the
+    same rows, behind the same search(keyword, filters) interface.
+
+    Filters are applied inside the search: when they leave at most
+    EXACT_SEARCH_MAX_ROWS jobs those are searched exactly, otherwise the HNSW
+    search skips the filtered-out rows. measure_recall compares the HNSW
+    results with exact search.
+    """
+
+    def __init__(self, embedder, job_ids, index, filter_index):
+        self.embedder = embedder  # anything with generate_embeddings([text]), e.g. EmbeddingGenerator
+        self.job_ids = list(job_ids)
+        self.index = index
+        self.index.hnsw.efSearch = HNSW_EF_SEARCH
+        self.exact_index = faiss.downcast_index(index.storage)  # same vectors, brute force
+        self.filter_index = filter_index
+
+    def __len__(self):
+        return len(self.job_ids)
+
+    ###########################################################################
+    # Building
+    ###########################################################################
+    @classmethod
+    def from_vectors(cls, embedder, job_ids, vectors, metadata_columns):
+        """
+        Builds the index from job vectors (e.g. fetched from the Pinecone index)
+        and the filter metadata columns of the same jobs ({field: [value, ...]}).
+        """
+        vectors = normalize_rows(vectors)
+        index = faiss.IndexHNSWFlat(vectors.shape[1], HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.add(vectors)
+        print(f"[LocalVectorDatabase] Indexed {index.ntotal} job vectors")
+        return cls(embedder, job_ids, index, JobFilterIndex(metadata_columns))
+
+    @classmethod
+    def from_job_store(cls, embedder, job_store):
+        """Embeds every job in a JobStore (see job_embedding_text) and indexes them."""
+        jobs = job_store.all_jobs()
+        texts = [job_embedding_text(job) for job in jobs]
+        vectors = []
+        for i in range(0, len(texts), EMBED_BATCH):
+            vectors.extend(embedder.generate_embeddings(texts[i:i + EMBED_BATCH]))
+        metadata = [job_metadata(job, job.get('posted_date')) for job in jobs]
+        columns = {field: [m[field] for m in metadata] for field in FILTER_FIELDS}
+        return cls.from_vectors(embedder, [job['job_id'] for job in jobs], np.array(vectors), columns)
+
+    def subset(self, job_ids):
+        """A new database over only `job_ids` (those it has), e.g. one shard's jobs."""
+        positions = {job_id: row for row, job_id in enumerate(self.job_ids)}
+        rows = [positions[job_id] for job_id in job_ids if job_id in positions]
+        vectors = self.exact_index.reconstruct_n(0, self.exact_index.ntotal)[rows]
+        columns = {
+            field: [self.filter_index.columns[field][row] for row in rows]
+            for field in FILTER_FIELDS
+        }
+        return LocalVectorDatabase.from_vectors(
+            self.embedder, [self.job_ids[row] for row in rows], vectors, columns
+        )
+
+    def save(self, directory):
+        """Writes the index to `directory` (hnsw.faiss + jobs.json)."""
+        os.makedirs(directory, exist_ok=True)
+        faiss.write_index(self.index, os.path.join(directory, "hnsw.faiss"))
+        columns = {}
+        for field in FILTER_FIELDS:
+            values = self.filter_index.columns[field]
+            columns[field] = [None if isinstance(v, float) and v != v else v for v in values]
+        with open(os.path.join(directory, "jobs.json"), "w") as f:
+            json.dump({"job_ids": self.job_ids, "metadata": columns}, f)
+
+    @classmethod
+    def load(cls, embedder, directory):
+        index = faiss.read_index(os.path.join(directory, "hnsw.faiss"))
+        with open(os.path.join(directory, "jobs.json")) as f:
+            data = json.load(f)
+        columns = {
+            field: values if field in CATEGORICAL_FIELDS else [np.nan if v is None else v for v in values]
+            for field, values in data["metadata"].items()
+        }
+        print(f"[LocalVectorDatabase] Loaded {index.ntotal} job vectors")
+        return cls(embedder, data["job_ids"], index, JobFilterIndex(columns))
+
+    ###########################################################################
+    # Search
+    ###########################################################################
+    def search_vector(self, query_vector, filters=None, top_k=TOP_K, exact=False):
+        """
+        [{'id': job_id, 'score': cosine}] for the top_k jobs closest to
+        query_vector that match `filters`, best first (the Pinecone matches shape).
+        """
+        query = normalize_rows(np.asarray(query_vector, dtype=np.float32).reshape(1, -1))
+        params = None
+        index = self.exact_index if exact else self.index
+        if filters:
+            mask = self.filter_index.mask(filters)
+            selected = int(mask.sum())
+            if selected == 0:
+                return []
+            if selected <= EXACT_SEARCH_MAX_ROWS:
+                index = self.exact_index
+            bitmap = np.packbits(mask, bitorder='little')  # must outlive the search
+            selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+            if index is self.exact_index:
+                params = faiss.SearchParameters(sel=selector)
+            else:
+                # Fewer matching neighbors per hop: widen the search to keep recall
+                ef_search = min(HNSW_EF_SEARCH_MAX, int(HNSW_EF_SEARCH * len(self) / selected))
+                params = faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search)
+            top_k = min(top_k, selected)
+        top_k = min(top_k, len(self))
+        if top_k == 0:
+            return []
+        scores, rows = index.search(query, top_k, params=params)
+        return [
+            {'id': self.job_ids[row], 'score': float(score)}
+            for score, row in zip(scores[0].tolist(), rows[0].tolist())
+            if row >= 0
+        ]
+
+    def search(self, keyword, filters):
+        query_embedding = self.embedder.generate_embeddings([keyword])[0]
+        return self.search_vector(query_embedding, filters)
+
+    def measure_recall(self, query_vectors, filters=None, top_k=TOP_K):
+        """
+        Average recall@top_k of the HNSW search against exact search for the
+        given query vectors (e.g. embeddings of logged search keywords).
+        """
+        recalls = []
+        for query_vector in query_vectors:
+            approx = {m['id'] for m in self.search_vector(query_vector, filters, top_k)}
+            exact = {m['id'] for m in self.search_vector(query_vector, filters, top_k, exact=True)}
+            if exact:
+                recalls.append(len(approx & exact) / len(exact))
+        return float(np.mean(recalls)) if recalls else 1.0
+
+
+###############################################################################
+# MAIN: build the index from the postings file
+#   python -m utils.local_vector_database <postings.xlsx> <output directory>
+###############################################################################
+if __name__ == "__main__":
+    import sys
+    import streamlit as st
+    from utils.embeddings import EmbeddingGenerator
+    from utils.job_store import load_job_store
+
+    postings_path, output_dir = sys.argv[1], sys.argv[2]
+    embedder = EmbeddingGenerator(
+        endpoint_name=st.secrets.pinecone.sagemaker_endpoint,
+        region=st.secrets.pinecone.aws_region,
+        embedding_dimension=1024,
+    )
+    database = LocalVectorDatabase.from_job_store(embedder, load_job_store(postings_path))
+    database.save(output_dir)
+    print(f"Saved {len(database)} jobs to {output_dir}")
@@ -1,7 +1,48 @@
-from pinecone import Pinecone
-from utils.embeddings import EmbeddingGenerator
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from utils.clients import embedding_generator, pinecone_index
+from utils.job_filter import EXP_LEVELS
+from utils.ttl_cache import MISSING, TTLCache
 import json
 
+TOP_K = 200  # default result budget
+MAX_TOP_K = 10000  # Pinecone's top_k limit for queries without metadata
+PAGE_SIZE = 200  # first query of each partition, so scoring can start early
+QUERY_WORKERS = 4  # partition queries in flight per search
+EMBEDDING_DIMENSION = 1024  # output size of the SageMaker embedding endpoint
+
+# Fields a search can be split on -> their values (see partition_filters)
+PARTITION_VALUES = {'exp_level': EXP_LEVELS}
+
+EMBEDDING_CACHE_SIZE = 10000  # query embeddings, by normalized keyword
+EMBEDDING_CACHE_TTL = 24 * 3600  # seconds
+RESULT_CACHE_SIZE = 1000  # search results, by (keyword, filters)
+RESULT_CACHE_TTL = 300  # seconds
+
+def normalize_keyword(keyword):
+    """Case- and whitespace-insensitive form of a search keyword."""
+    return " ".join((keyword or "").split()).lower()
+
+def canonical_filters(filters):
+    """A hashable form of a filter dict that does not depend on key order."""
+    return json.dumps(filters or {}, sort_keys=True, default=str)
+
+def partition_filters(filters, field, values):
+    """
+    Splits `filters` into disjoint filters, one per value of `field` plus one
+    for any other value, that together match the same jobs. Returns [filters]
+    if they already constrain `field`.
+    """
+    filters = filters or {}
+    if field in filters:
+        return [filters]
+    partitions = [{**filters, field: {'$eq': value}} for value in values]
+    partitions.append({**filters, field: {'$nin': list(values)}})
+    return partitions
+
+def split_budget(budget, n):
+    """`budget` split into n near-equal shares."""
+    return [budget // n + (1 if i < budget % n else 0) for i in range(n)]
+
 class PineconeDatabase:
     """Class for pinecone database to access and to retrieve"""
     def __init__(self, api_key, index_name, aws_region, sagemaker_endpoint, namespace="job_strings"):
@@ -9,7 +50,10 @@ class PineconeDatabase:
         self.index_name = index_name
         self.aws_region = aws_region
         self.namespace = namespace
-        self.embedder = EmbeddingGenerator(endpoint_name=sagemaker_endpoint, region=aws_region, embedding_dimension=1024)
+        # Shared with any other user of the same endpoint (see utils/clients.py)
+        self.embedder = embedding_generator(sagemaker_endpoint, aws_region, EMBEDDING_DIMENSION)
+        self.embedding_cache = TTLCache(EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL)
+        self.result_cache = TTLCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
         
     def connect_to_pinecone(self):
         """
@@ -18,11 +62,8 @@ class PineconeDatabase:
             Pinecone index object
         """
         try:
-            # Initialize Pinecone client
-            pc = Pinecone(api_key=self.api_key)
-        
-            # Connect to the existing index
-            index = pc.Index(self.index_name)
+            # Pinecone client and index are shared by the process (see utils/clients.py)
+            index = pinecone_index(self.api_key, self.index_name)
             self.index = index
             
             return index
@@ -31,8 +72,133 @@ class PineconeDatabase:
             print(f"Error connecting to Pinecone: {str(e)}")
             return None
         
-    def search(self, keyword, filters):
-        query_embedding = self.embedder.generate_embeddings([keyword])[0]
-        search_results = self.index.query(vector=query_embedding, filter=filters, top_k=200, include_metadata=False)
+    def embed_keyword(self, keyword):
+        """
+        Query embedding of the keyword as given, cached under its normalized
+        form. A zero vector (the embedder's fallback when SageMaker fails) is
+        not cached, so the next search tries again.
+        """
+        key = normalize_keyword(keyword)
+        query_embedding = self.embedding_cache.get(key, MISSING)
+        if query_embedding is MISSING:
+            query_embedding = [float(x) for x in self.embedder.generate_embeddings([keyword])[0]]
+            if any(query_embedding):
+                self.embedding_cache.put(key, query_embedding)
+        return query_embedding
 
+    def query(self, query_embedding, filters, top_k):
+        search_results = self.index.query(vector=query_embedding, filter=filters, top_k=top_k, include_metadata=False)
         return search_results['matches']
+
+    def search_vector(self, query_vector, filters=None, top_k=TOP_K):
+        """
+        The top_k (at most MAX_TOP_K) matches closest to a ready-made query
+        vector, e.g. a pooled resume embedding (see candidate_retrieval.py).
+        """
+        return self.query([float(x) for x in query_vector], filters, min(top_k, MAX_TOP_K))
+
+    def search_stream(self, keyword, filters, budget=TOP_K, partition_field=None):
+        """
+        Yields the matches for the keyword and filters page by page as they
+        arrive, up to `budget` matches in all and without repeats, so the job
+        lookup and scoring can start on the first page.
+
+        Pinecone has no cursor, so a partition is paged by querying it again
+        with a larger top_k: first PAGE_SIZE, then its whole share of the
+        budget, and only the matches not seen yet are yielded. A search that
+        asks for few matches makes one small query; one that asks for many is
+        no longer cut off at a fixed top_k.
+
+        With a partition_field (see PARTITION_VALUES), the search is split into
+        one query per value of that field, run in parallel, each with an equal
+        share of the budget. The budget left by partitions with fewer matches
+        goes to those that may have more; past MAX_TOP_K per partition it is
+        the only way to get more matches.
+
+        Complete result lists are cached like search results, unless the
+        keyword could not be embedded.
+        """
+        key = (normalize_keyword(keyword), canonical_filters(filters), budget, partition_field)
+        matches = self.result_cache.get(key, MISSING)
+        if matches is not MISSING:
+            if matches:
+                yield list(matches)
+            return
+
+        query_embedding = self.embed_keyword(keyword)
+        if partition_field:
+            partitions = partition_filters(filters, partition_field, PARTITION_VALUES[partition_field])
+        else:
+            partitions = [filters]
+        quotas = split_budget(budget, len(partitions))
+        fetched = [0] * len(partitions)  # top_k of each partition's last query
+        unfinished = set(range(len(partitions)))  # partitions that may have more matches
+        seen = set()
+        collected = []
+
+        executor = ThreadPoolExecutor(max_workers=QUERY_WORKERS)
+        pending = {}
+
+        def submit(i):
+            top_k = min(quotas[i] if fetched[i] else PAGE_SIZE, quotas[i], MAX_TOP_K)
+            pending[executor.submit(self.query, query_embedding, partitions[i], top_k)] = (i, top_k)
+
+        try:
+            for i, quota in enumerate(quotas):
+                if quota > 0:
+                    submit(i)
+            while pending and len(collected) < budget:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i, top_k = pending.pop(future)
+                    matches = future.result()
+                    fetched[i] = top_k
+                    if len(matches) < top_k:
+                        unfinished.discard(i)
+                    elif top_k >= MAX_TOP_K:
+                        unfinished.discard(i)
+                        print(f"[PineconeDatabase] Partition {partitions[i]} stopped at MAX_TOP_K matches")
+                    page = []
+                    for match in matches:
+                        if len(collected) + len(page) >= budget:
+                            break
+                        if match['id'] not in seen:
+                            seen.add(match['id'])
+                            page.append(match)
+                    collected.extend(page)
+                    if page:
+                        yield page
+                    if i in unfinished and fetched[i] < quotas[i]:
+                        submit(i)
+
+                if not pending and len(collected) < budget and unfinished:
+                    # Hand the budget left over to the partitions that may have more
+                    more = sorted(unfinished)
+                    for i, share in zip(more, split_budget(budget - len(collected), len(more))):
+                        if share > 0:
+                            quotas[i] = fetched[i] + share
+                            submit(i)
+        finally:
+            # If the consumer stops early, don't wait for the queries in flight
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        print(f"[PineconeDatabase] {len(collected)} matches from {len(partitions)} partition(s)")
+        if any(query_embedding):
+            self.result_cache.put(key, collected)
+
+    def search(self, keyword, filters, budget=TOP_K, partition_field=None):
+        """
+        The top `budget` matches for the keyword and filters (see
+        search_stream), best first. Repeated searches are served from the
+        result cache (and the keyword's embedding from the embedding cache)
+        without calling SageMaker or Pinecone.
+        """
+        matches = [match for page in self.search_stream(keyword, filters, budget, partition_field) for match in page]
+        matches.sort(key=lambda match: -match['score'])
+        return matches
+
+    def clear_search_cache(self):
+        """Drops cached results (and embeddings); call when a corpus ingestion finishes."""
+        self.result_cache.clear()
+        self.embedding_cache.clear()
+        print("[PineconeDatabase] Search cache cleared")
@@ -1,14 +1,19 @@
 import json
 from datetime import datetime
-from openai import OpenAI
 import streamlit as st
+from utils.clients import openai_client
 
 class resume_extractor:
     def __init__(self, api_key):
         api_key = st.secrets["openai"]["api_key"]
+        self.api_key = api_key
         self.current_month_year = datetime.now().strftime("%B %Y")
-        self.client = OpenAI(api_key =api_key)
         print("Resume extractor is loaded...")
+
+    @property
+    def client(self):
+        # Created on first use and shared by the process (see utils/clients.py)
+        return openai_client(self.api_key)
     
     def reformat_resume(self, resume):
         response = self.client.chat.completions.create(